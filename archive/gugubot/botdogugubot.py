@@ -12,6 +12,7 @@ from telegram import Bot, User, Message, MessageEntity, PhotoSize
 from telegram.ext import Updater, Filters, CommandHandler, MessageHandler, BaseFilter, InlineQueryHandler
 
 ## Local
+from telebot.bot import Keyboard
 from telebot.game import GameBot, Game, Player, GameError
 from telebot.proxy import Proxy, lock_start, lock_group
 from telebot.layer import Layer, with_info, log
@@ -35,6 +36,8 @@ class GuguGame(Game):
     START_GIFS = os.listdir('assets/start')
     FINISH_GIFS = os.listdir('assets/finish')
 
+    OBJETO_KEYBOARD = Keyboard('objeto', [('Sim', {'payload': True}), ('Não', {'payload': False})])
+
     def __init__(self, bot: Bot, chat_id: int):
         Game.__init__(self, bot, chat_id)
     
@@ -82,15 +85,11 @@ class GuguGame(Game):
     def ask_photo(self):
         self.photo_answer: PhotoAnswer = self.photo_queue.pop()
 
-        keyboard_markup = GameBot.keyboard_markup('objeto',
-            [('Sim', {'data': True}), ('Não', {'data': False})]
-        )
-
         kwargs = {
             'chat_id': self.master.chat_id,
             'photo': self.photo_answer.photo, 
             'caption': 'Tá certo isso Gugu?',
-            'reply_markup': keyboard_markup
+            'reply_markup': self.OBJETO_KEYBOARD
         }
         self.bot.send_photo(**kwargs)
 
@@ -243,12 +242,12 @@ class GuguBot(GameBot):
         return info['query'].answer()
 
     @GameBot.query('objeto')
-    def objeto(self, info: dict, data: str):
+    def objeto(self, info: dict, data: bool):
         game = self.get_game(info)
         
-        if data == 'True':
+        if data is True:
             game.accept_photo()
-        elif data == 'False':
+        elif data is False:
             game.reject_photo()
         else:
             raise GameError('Received data is neither `True` nor `False`')
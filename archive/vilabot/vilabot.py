@@ -9,20 +9,17 @@ from telegram.ext import Updater, CommandHandler, MessageHandler, BaseFilter, Fi
 from telebot import TeleBot
 from telebot.proxy import Proxy, lock_start, lock_awake
 from telebot.layer import Layer, with_info
-from telebot.filters import Mention
+from telebot.filters import Mention, Keywords
 from telebot.botlib import start_logging, load, stdwar, stderr, stdout
 
 TOKEN = load('vilabot.token')
 
-class MoonEmoji(BaseFilter):
+class MoonEmoji(Keywords):
 
     MOONS = ['🌝','🌕','🌗','🌘','🌖','🌙','🌛','🌚','🌑','🌓','🌒','🌔','☪','☾','☽']
 
     def __init__(self):
-        self.regex = re.compile('|'.join(self.MOONS), re.MULTILINE)
-
-    def filter(self, message: Message):
-        return self.regex.search(message.text) is not None
+        Keywords.__init__(self, self.MOONS)
 
 class VilaBot(TeleBot):
 
@@ -127,6 +127,8 @@ kwargs = {
     #
     "packages" : [
         "telebot",
+        "telebot.aio",
+        "telebot.bench",
         "telebot.bot",
         "telebot.botlib",
         "telebot.chat",
@@ -162,6 +164,7 @@ kwargs = {
     # projects.
     "extras_require" : {  # Optional
         'archive': ['lorem'],
+        'async': ['aiohttp'],
         ## 'test': ['satyrus3-test'],
     },
 
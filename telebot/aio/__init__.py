@@ -0,0 +1,2 @@
+from .aio import AsyncTeleBot, Context
+from .client import Client, ClientBot, APIError
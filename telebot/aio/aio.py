@@ -0,0 +1,280 @@
+## Standard Library
+import asyncio
+import traceback
+from inspect import isawaitable
+
+## Third-Party
+from telegram import Update
+
+## Local
+from ..bot import TeleBot, Keyboard
+from ..bot.bot import MetaTeleBot
+from ..bot.router import parse_command
+from ..botlib import stderr, stdout
+from ..filters import FilterCompiler
+from .client import Client, ClientBot
+
+class MetaAsyncTeleBot(MetaTeleBot):
+
+    asynchronous = True
+
+class Context(object):
+    """ Context(bot: Client)
+
+        Stands for `telegram.ext.CallbackContext` in async bots: `bot` is
+        the `Client`, `args` the words after a command and `error` the
+        exception given to the error handler.
+    """
+
+    __slots__ = ('bot', 'args', 'error')
+
+    def __init__(self, bot: Client):
+        self.bot = bot
+        self.args = None
+        self.error = None
+
+class AsyncTeleBot(TeleBot, metaclass=MetaAsyncTeleBot):
+    """ AsyncTeleBot(token: str, url: str=None, connections: int=100, concurrency: int=1000, timeout: int=30)
+
+        `TeleBot` running on a single asyncio event loop. Handlers,
+        proxies and layers are declared as in `TeleBot`, and any of them
+        may be a coroutine. API calls are awaited through the `Client`,
+        found at `info['bot']` and `context.bot`:
+
+        >>> class MyBot(AsyncTeleBot):
+        ...     @with_info
+        ...     @AsyncTeleBot.command('start')
+        ...     async def start(self, info):
+        ...         await info['bot'].send_message(chat_id=info['chat_id'], text='Hello!')
+
+        Shortcuts of updates, such as `update.message.reply_text(...)` or
+        `info['query'].answer()`, call the `Client` too, see `ClientBot`,
+        and are awaited as well. Results are decoded JSON, not `telegram`
+        objects.
+
+        Updates are long polled, `timeout` seconds at a time, or received
+        through a webhook with `run(webhook=True)`, and handled
+        concurrently, at most `concurrency` at once, over at most
+        `connections` HTTP connections. Each update goes to the first
+        matching handler: commands, then message handlers in the order
+        they were defined, or query handlers.
+
+        Requires the `async` extra: `pip install telebot[async]`.
+    """
+
+    def __init__(self, token: str=None, url: str=None, connections: int=100, concurrency: int=1000, timeout: int=30, **options):
+        self.token = token
+        self.client = Client(token, url=url, connections=connections)
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+        ## Message filters, shared by handlers
+        self.filter_compiler = FilterCompiler()
+
+        ## Set by `getMe` on start
+        self.me = None
+
+        ## Local address of the webhook, once started
+        self.webhook_url = None
+
+        ## Set by `record`
+        self.recorder = None
+
+        self.__loop = None
+        self.__poller = None
+        self.__slots = None
+        self.__tasks = set()
+
+        ## Add Handlers
+        self.add_handlers()
+        stdout[1] << "> Handlers added"
+
+    ## Context Management
+    async def __aenter__(self):
+        await self.client.open()
+        self.me = await self.client.get_me()
+        self.load()
+        return self
+
+    async def __aexit__(self, *args):
+        try:
+            self.save()
+            self.__data__.close()
+        finally:
+            await self.client.close()
+
+    ## Event Handlers
+    def add_handlers(self):
+        ## Command name -> handler, as `CommandHandler` compares them
+        self.__commands = {command_name.lower(): callback for command_name, callback, _ in self.command_handlers}
+        for command_name, callback, _ in self.command_handlers:
+            stdout[3] << f"> Add Command Handler: /{command_name} @{callback}"
+        self.__messages = [(self.filter_compiler.compile(filters), callback) for filters, callback, _ in self.message_handlers]
+        for filters, callback in self.__messages:
+            stdout[3] << f"> Add Message Handler: [{filters}] @{callback}"
+        ## Keyboard key -> query handler
+        self.__queries = {key: callback for callback, key in self.query_handlers}
+        for callback, key in self.query_handlers:
+            stdout[3] << f"> Add Query Handler: [{key}] @{callback}"
+
+    def route(self, update: Update, context: Context) -> callable:
+        """ Handler for `update`, if any, setting `context.args` for commands.
+        """
+        if update.callback_query is not None:
+            key, sep, _ = Keyboard.split(update.callback_query.data)
+            return self.__queries.get(key) if sep else None
+
+        message = update.effective_message
+        if message is None:
+            return None
+
+        parsed = parse_command(message, self.me['username'])
+        if parsed is not None and parsed[0] in self.__commands:
+            command, context.args = parsed
+            return self.__commands[command]
+
+        for filters, callback in self.__messages:
+            if filters(update):
+                return callback
+        return None
+
+    async def process(self, data: dict):
+        """ Handles a single update, as decoded from the Bot API.
+        """
+        if self.recorder is not None:
+            self.recorder.write(data, self.username)
+        update = Update.de_json(data, ClientBot(self.client))
+        context = Context(self.client)
+        try:
+            callback = self.route(update, context)
+            if callback is not None:
+                result = callback(self, update, context)
+                if isawaitable(result):
+                    await result
+        except Exception as error:
+            await self.on_error(update, context, error)
+
+    def record(self, recorder: object) -> object:
+        """ Writes every update received, before it is handled, to
+            `recorder`, as `TeleBot.record` does.
+        """
+        from ..bench import Recorder
+        if not isinstance(recorder, Recorder):
+            recorder = Recorder(recorder)
+        self.recorder = recorder
+        return recorder
+
+    async def on_error(self, update: Update, context: Context, error: Exception):
+        if self.error_handler is None:
+            for line in traceback.format_tb(error.__traceback__):
+                stderr[1] << line
+            stderr[1] << f"> Handler failed: {error}"
+            return
+        context.error = error
+        result = self.error_handler(self, update, context)
+        if isawaitable(result):
+            await result
+
+    async def dispatch(self, data: dict):
+        """ Schedules `process(data)`, waiting while `concurrency` updates are in flight.
+        """
+        await self.__slots.acquire()
+        task = asyncio.ensure_future(self.process(data))
+        self.__tasks.add(task)
+        task.add_done_callback(self.__done)
+
+    def __done(self, task: asyncio.Task):
+        self.__tasks.discard(task)
+        self.__slots.release()
+
+    async def poll(self):
+        offset = None
+        while True:
+            try:
+                updates = await self.client.get_updates(offset=offset, timeout=self.timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                stderr[1] << f"> Polling failed: {error}"
+                await asyncio.sleep(1.0)
+                continue
+            for data in updates:
+                offset = data['update_id'] + 1
+                await self.dispatch(data)
+
+    async def listen(self, listen: str=None, port: int=None, secret: str=None, url: str=None):
+        """ Serves updates POSTed to `http://listen:port/secret` until
+            cancelled, as `TeleBot.start_webhook` does.
+        """
+        from aiohttp import web
+        listen, port, secret = self.webhook_options(listen, port, secret)
+
+        async def receive(request):
+            try:
+                data = await request.json()
+            except ValueError:
+                return web.Response(status=400)
+            ## Waits while `concurrency` updates are in flight
+            await self.dispatch(data)
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post(f'/{secret}', receive)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, listen, port).start()
+            if url is not None:
+                await self.client.set_webhook(url=f"{url.rstrip('/')}/{secret}")
+                stdout[1] << f"> Webhook set at {url}"
+            self.webhook_url = f"http://{listen}:{port}/{secret}"
+            stdout[1] << f"> Webhook listening on {listen}:{port}"
+            await asyncio.get_event_loop().create_future()
+        finally:
+            await runner.cleanup()
+
+    async def serve(self, webhook: bool=False, listen: str=None, port: int=None, secret: str=None, url: str=None):
+        """ Loads data, polls or, with `webhook`, listens for updates and
+            handles them until `stop`, then saves.
+        """
+        self.__loop = asyncio.get_event_loop()
+        self.__slots = asyncio.Semaphore(self.concurrency)
+        async with self:
+            if webhook:
+                self.__poller = asyncio.ensure_future(self.listen(listen, port, secret, url))
+                stdout[0] << "> Started Webhook."
+            else:
+                self.__poller = asyncio.ensure_future(self.poll())
+                stdout[0] << "> Started Polling."
+            try:
+                await self.__poller
+            except asyncio.CancelledError:
+                pass
+            finally:
+                if self.__tasks:
+                    await asyncio.gather(*self.__tasks, return_exceptions=True)
+                stdout[0] << "> Stopped"
+
+    def run(self, idle: bool=True, webhook: bool=False, listen: str=None, port: int=None, secret: str=None, url: str=None, workers: int=None):
+        """ Serves until `stop`; `workers` replaces `concurrency`.
+        """
+        if workers is not None:
+            self.concurrency = workers
+        try:
+            asyncio.run(self.serve(webhook=webhook, listen=listen, port=port, secret=secret, url=url))
+        except KeyboardInterrupt:
+            stderr[1] << "Keyboard Interrupt"
+
+    def main(self):
+        args = self.parse_args()
+        self.run(webhook=args.webhook, listen=args.listen, port=args.port, secret=args.secret, url=args.url, workers=args.workers)
+
+    def stop(self):
+        """ Stops polling or listening; may be called from any thread.
+        """
+        if self.__poller is not None:
+            self.__loop.call_soon_threadsafe(self.__poller.cancel)
+
+    @property
+    def username(self):
+        return None if self.me is None else f"@{self.me['username']}"
@@ -0,0 +1,150 @@
+## Standard Library
+import os
+import json
+import inspect
+from functools import partial
+
+## Third-Party
+import telegram
+
+class APIError(Exception):
+    """ Error answered by the Bot API, with its `error_code`.
+    """
+
+    def __init__(self, description: str, error_code: int=None):
+        Exception.__init__(self, description)
+        self.error_code = error_code
+
+class Client(object):
+    """ Client(token: str, url: str=None, connections: int=100, timeout: float=None)
+
+        Bot API client over a pooled `aiohttp` session, of at most
+        `connections` open connections. Methods are called by their
+        snake case names and answer the decoded `result`:
+
+        >>> message = await client.send_message(chat_id=chat_id, text='Hi!')
+        >>> message['message_id']
+
+        Files, opened in binary mode, are uploaded as a multipart form,
+        and objects with a `file_id`, such as a `PhotoSize`, are sent by it:
+
+        >>> await client.send_animation(chat_id=chat_id, animation=open('start.gif', 'rb'))
+
+        `url` points it to another server, such as a local fake one.
+        Requires the `async` extra: `pip install telebot[async]`.
+    """
+
+    URL = 'https://api.telegram.org'
+
+    def __init__(self, token: str, url: str=None, connections: int=100, timeout: float=None):
+        self.token = token
+        self.url = self.URL if url is None else url.rstrip('/')
+        self.connections = connections
+        self.timeout = timeout
+
+        self.session = None
+
+    async def open(self):
+        ## Imported here, so that `aiohttp` is only needed by async bots
+        import aiohttp
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.connections)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def call(self, method: str, **params) -> object:
+        """ Calls `method`, by its Bot API name. Parameters set to `None`
+            are left out and objects with `to_dict`, such as keyboards,
+            are converted.
+        """
+        params = {key: self.encode(value) for key, value in params.items() if value is not None}
+        if any(hasattr(value, 'read') for value in params.values()):
+            body = {'data': self.form(params)}
+        else:
+            body = {'json': params}
+        async with self.session.post(f'{self.url}/bot{self.token}/{method}', **body) as response:
+            payload = await response.json(content_type=None)
+        if not payload.get('ok', False):
+            raise APIError(payload.get('description', f'HTTP {response.status}'), payload.get('error_code'))
+        return payload['result']
+
+    @staticmethod
+    def encode(value: object) -> object:
+        if hasattr(value, 'file_id'):
+            return value.file_id
+        elif hasattr(value, 'to_dict'):
+            return value.to_dict()
+        return value
+
+    @staticmethod
+    def form(params: dict) -> object:
+        ## Multipart form, with files as they are and other values as JSON unless strings
+        import aiohttp
+        form = aiohttp.FormData()
+        for key, value in params.items():
+            if hasattr(value, 'read'):
+                form.add_field(key, value, filename=os.path.basename(getattr(value, 'name', None) or key))
+            else:
+                form.add_field(key, value if isinstance(value, str) else json.dumps(value))
+        return form
+
+    @staticmethod
+    def method(name: str) -> str:
+        ## send_message -> sendMessage
+        head, *tail = name.split('_')
+        return head + ''.join(word.capitalize() for word in tail)
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return partial(self.call, self.method(name))
+
+class ClientBot(object):
+    """ ClientBot(client: Client)
+
+        Stands for `telegram.Bot` in the updates of async bots, so that
+        shortcuts such as `message.reply_text` and `query.answer` call
+        `client`. They answer coroutines, to be awaited, whose result is
+        the decoded `result`, not a `telegram` object:
+
+        >>> await update.message.reply_text('Hi!')
+
+        Positional arguments are named as by `telegram.Bot`.
+    """
+
+    ## Method name -> `telegram.Bot` signature
+    SIGNATURES = {}
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.defaults = None
+
+    @classmethod
+    def signature(cls, name: str) -> inspect.Signature:
+        if name not in cls.SIGNATURES:
+            method = getattr(telegram.Bot, name, None)
+            if not callable(method):
+                raise AttributeError(name)
+            cls.SIGNATURES[name] = inspect.signature(method)
+        return cls.SIGNATURES[name]
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        signature = self.signature(name)
+
+        def call(*args, **kwargs):
+            params = signature.bind(self, *args, **kwargs).arguments
+            params.pop('self')
+            params.update(params.pop('kwargs', {}))
+            ## Request options of `telegram.Bot`, not parameters
+            params.pop('timeout', None)
+            params.pop('api_kwargs', None)
+            return self.client.call(Client.method(name), **params)
+        call.__name__ = name
+        return call
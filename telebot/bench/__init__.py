@@ -0,0 +1,4 @@
+from .bench import Benchmark
+from .server import FakeServer
+from .load import LoadGenerator
+from .replay import Recorder, Replay
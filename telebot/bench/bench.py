@@ -0,0 +1,247 @@
+## Standard Library
+import json
+import time
+import queue
+import socket
+import threading
+import http.client
+
+## Local
+from ..botlib import stdout, stderr
+from .server import FakeServer
+from .load import LoadGenerator
+
+class Benchmark(object):
+    """ Benchmark(bot_class: type, count: int=1000, chats: int=100, answers: int=1, webhook: bool=False, workers: int=None, latency: float=0.0, timeout: float=60.0, generator: LoadGenerator=None, **options)
+
+        Runs a `TeleBot` or `AsyncTeleBot` subclass against a `FakeServer`,
+        polling or, with `webhook`, through its webhook, until it answered
+        `count` updates from a `LoadGenerator` or `timeout` seconds passed.
+        `options` go to the bot, `workers` to its `run`, and `latency` to
+        the server, as the time each API call takes.
+
+        Each of the `chats` sends its next update once the bot made
+        `answers` API calls (messages sent, queries answered, ...) for the
+        previous one, the latency of an update being the time from when it
+        is sent to the last of those calls. Updates that are never
+        answered hold their chat up, and are counted as `unanswered`.
+        Async bots load and save their data, as their `run` does.
+
+        >>> report = Benchmark(MyBot, count=5000, chats=50, workers=8).run()
+        >>> report['updates_per_sec'], report['latency_p99']
+    """
+
+    TOKEN = '123456:benchmark'
+    SECRET = 'benchmark'
+
+    ## Calls answering an update, by prefix
+    ANSWERS = ('send', 'edit', 'answer', 'delete', 'forward', 'copy')
+
+    def __init__(self, bot_class: type, count: int=1000, chats: int=100, answers: int=1, webhook: bool=False, workers: int=None, latency: float=0.0, timeout: float=60.0, generator: LoadGenerator=None, **options):
+        self.bot_class = bot_class
+        self.count = count
+        self.chats = chats
+        self.answers = answers
+        self.webhook = webhook
+        self.workers = workers
+        self.latency = latency
+        self.timeout = timeout
+        self.generator = generator
+        self.options = options
+
+        self.__lock = threading.Lock()
+        self.__done = threading.Event()
+        self.__feed = None
+        self.__server = None
+
+    def run(self) -> dict:
+        """ Runs the benchmark, returning the `report`.
+        """
+        generator = self.generator or LoadGenerator(self.chats)
+        self.__generator = generator
+
+        ## chat id -> [time sent, answers left], and query id -> chat id
+        self.__pending = {}
+        self.__queries = {}
+        self.sent = 0
+        self.answered = 0
+        self.calls = 0
+        self.extra = 0
+        self.latencies = []
+        self.__done.clear()
+
+        with FakeServer(token=self.TOKEN, username=generator.username, latency=self.latency) as server:
+            self.__server = server
+            server.listeners.append(self.__on_call)
+            bot = self.bot_class(self.TOKEN, url=server.url, **self.options)
+            port = self.free_port() if self.webhook else None
+            thread = self.start(bot, port)
+            if self.webhook:
+                self.__feed = queue.Queue()
+                feeder = threading.Thread(target=self.feed, args=(port,), name='telebot-bench-feed', daemon=True)
+                feeder.start()
+
+            start = time.perf_counter()
+            for chat_id in list(generator.chat_ids())[:self.count]:
+                self.send(chat_id)
+            if not self.__done.wait(self.timeout):
+                stderr[1] << f"> Benchmark timed out, {self.sent - self.answered} updates unanswered"
+            duration = time.perf_counter() - start
+
+            server.release()
+            if self.webhook:
+                self.__feed.put(None)
+                feeder.join(self.timeout)
+            bot.stop()
+            if thread is not None:
+                thread.join(self.timeout)
+
+        report = self.report(duration)
+        stdout[1] << "> {bot} ({mode}): {updates} updates in {duration:.2f}s, {updates_per_sec:.1f}/s, latency p50 {latency_p50:.4f}s p99 {latency_p99:.4f}s".format(**report)
+        return report
+
+    def start(self, bot: object, port: int) -> threading.Thread:
+        ## Async bots run until stopped, on a thread of their own
+        options = {'webhook': self.webhook, 'port': port, 'secret': self.SECRET, 'workers': self.workers}
+        if getattr(type(bot), 'asynchronous', False):
+            thread = threading.Thread(target=bot.run, kwargs=options, name='telebot-bench-bot', daemon=True)
+            thread.start()
+            return thread
+        else:
+            bot.run(idle=False, **options)
+            return None
+
+    @staticmethod
+    def free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def send(self, chat_id: int):
+        with self.__lock:
+            if self.sent >= self.count:
+                return
+            self.sent += 1
+            update = self.__generator.update(chat_id)
+            if 'callback_query' in update:
+                self.__queries[update['callback_query']['id']] = chat_id
+            self.__pending[chat_id] = [time.perf_counter(), self.answers]
+        if self.webhook:
+            self.__feed.put(update)
+        else:
+            self.__server.push(update)
+
+    def feed(self, port: int):
+        ## POSTs updates to the bot's webhook, on a kept-alive connection
+        connection = None
+        update_id = 0
+        while True:
+            update = self.__feed.get()
+            if update is None:
+                break
+            update_id += 1
+            update['update_id'] = update_id
+            body = json.dumps(update).encode('utf-8')
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    if connection is None:
+                        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=self.timeout)
+                    connection.request('POST', f'/{self.SECRET}', body, {'Content-Type': 'application/json'})
+                    connection.getresponse().read()
+                    break
+                except (OSError, http.client.HTTPException):
+                    ## Not listening yet, or the connection was closed
+                    connection = None
+                    if time.monotonic() > deadline:
+                        stderr[1] << "> Benchmark webhook unreachable"
+                        return
+                    time.sleep(0.05)
+        if connection is not None:
+            connection.close()
+
+    def __on_call(self, method: str, params: dict, now: float):
+        if not method.startswith(self.ANSWERS):
+            return
+        chat_id = params.get('chat_id')
+        if chat_id is None:
+            chat_id = self.__queries.get(params.get('callback_query_id'))
+        if chat_id is None:
+            ## Such as `deleteWebhook`, on start
+            return
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        with self.__lock:
+            self.calls += 1
+            pending = self.__pending.get(chat_id)
+            if pending is None:
+                self.extra += 1
+                return
+            pending[1] -= 1
+            if pending[1] > 0:
+                return
+            del self.__pending[chat_id]
+            self.latencies.append(now - pending[0])
+            self.answered += 1
+            if self.answered >= self.count:
+                self.__done.set()
+                return
+        self.send(chat_id)
+
+    @staticmethod
+    def percentile(values: list, p: float) -> float:
+        ## Nearest rank, of sorted `values`
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values))) - 1))]
+
+    def report(self, duration: float) -> dict:
+        """ `updates` answered, out of those `sent`, per second, latency
+            average and percentiles in seconds, and API `calls` made,
+            `extra` ones answering no pending update.
+        """
+        latencies = sorted(self.latencies)
+        return {
+            'bot': self.bot_class.__name__,
+            'mode': 'webhook' if self.webhook else 'polling',
+            'updates': self.answered,
+            'sent': self.sent,
+            'unanswered': self.sent - self.answered,
+            'duration': duration,
+            'updates_per_sec': (self.answered / duration) if duration else 0.0,
+            'latency_avg': (sum(latencies) / len(latencies)) if latencies else 0.0,
+            'latency_p50': self.percentile(latencies, 50),
+            'latency_p90': self.percentile(latencies, 90),
+            'latency_p99': self.percentile(latencies, 99),
+            'latency_max': latencies[-1] if latencies else 0.0,
+            'calls': self.calls,
+            'extra': self.extra,
+        }
+
+def main():
+    """ python -m telebot.bench module:BotClass [--count N] [--chats N] ...
+    """
+    import argparse
+    import importlib
+    parser = argparse.ArgumentParser(description='Benchmark a bot against a local fake Bot API server')
+    parser.add_argument('bot', help='Bot class, as `module:Class`')
+    parser.add_argument('--count', type=int, default=1000, help='Updates to answer')
+    parser.add_argument('--chats', type=int, default=100, help='Chats sending updates at once')
+    parser.add_argument('--answers', type=int, default=1, help='API calls answering each update')
+    parser.add_argument('--commands', nargs='*', default=['start'], help='Commands to send')
+    parser.add_argument('--texts', nargs='*', default=['Hello'], help='Texts to send')
+    parser.add_argument('--queries', nargs='*', default=[], help='Callback query data to send')
+    parser.add_argument('--webhook', action='store_true', help='Feed updates through the webhook')
+    parser.add_argument('--workers', type=int, help='Handler threads, or concurrency for async bots')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each API call takes')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Seconds to wait at most')
+    args = parser.parse_args()
+
+    module, _, name = args.bot.partition(':')
+    bot_class = getattr(importlib.import_module(module), name)
+    generator = LoadGenerator(args.chats, commands=args.commands, texts=args.texts, queries=args.queries)
+    benchmark = Benchmark(bot_class, count=args.count, chats=args.chats, answers=args.answers, webhook=args.webhook, workers=args.workers, latency=args.latency, timeout=args.timeout, generator=generator)
+    for key, value in benchmark.run().items():
+        print(f"{key}: {value:.6f}" if isinstance(value, float) else f"{key}: {value}")
@@ -0,0 +1,91 @@
+## Standard Library
+import time
+import random
+
+class LoadGenerator(object):
+    """ LoadGenerator(chats: int=100, commands: list=('start',), texts: list=('Hello',), queries: list=(), weights: tuple=(1, 1, 1), username: str='fakebot', seed: int=None)
+
+        Makes Bot API updates from `chats` private chats, one user each:
+        commands such as `/start`, text messages and callback queries with
+        data such as `key:data`, picked at random from `commands`, `texts`
+        and `queries`. Kinds are drawn with `weights`, in that order, those
+        with nothing to pick from left out.
+
+        Updates are dictionaries, as `FakeServer.push` takes them.
+    """
+
+    KINDS = ('command', 'message', 'query')
+
+    def __init__(self, chats: int=100, commands: list=('start',), texts: list=('Hello',), queries: list=(), weights: tuple=(1, 1, 1), username: str='fakebot', seed: int=None):
+        self.chats = chats
+        self.commands = list(commands)
+        self.texts = list(texts)
+        self.queries = list(queries)
+        self.username = username
+        self.random = random.Random(seed)
+
+        choices = (self.commands, self.texts, self.queries)
+        self.kinds = [kind for kind, choice in zip(self.KINDS, choices) if choice]
+        self.weights = [weight for weight, choice in zip(weights, choices) if choice]
+        if not self.kinds:
+            raise ValueError("Nothing to make updates from: `commands`, `texts` and `queries` are empty.")
+
+        self.__message_id = 0
+        self.__query_id = 0
+
+    def chat_ids(self) -> range:
+        return range(1, self.chats + 1)
+
+    def update(self, chat_id: int, kind: str=None) -> dict:
+        """ Random update from `chat_id`, of a random `kind` unless given.
+        """
+        kind = self.random.choices(self.kinds, self.weights)[0] if kind is None else kind
+        if kind == 'command':
+            return {'message': self.command(chat_id, self.random.choice(self.commands))}
+        elif kind == 'message':
+            return {'message': self.message(chat_id, self.random.choice(self.texts))}
+        elif kind == 'query':
+            return {'callback_query': self.query(chat_id, self.random.choice(self.queries))}
+        else:
+            raise ValueError(f"Unknown update kind `{kind}`, expected one of {self.KINDS}.")
+
+    def updates(self, count: int):
+        """ `count` random updates, from each chat in turn.
+        """
+        for index in range(count):
+            yield self.update(1 + (index % self.chats))
+
+    def user(self, chat_id: int) -> dict:
+        return {'id': chat_id, 'is_bot': False, 'first_name': f'User {chat_id}', 'username': f'user{chat_id}'}
+
+    def message(self, chat_id: int, text: str, entities: list=None) -> dict:
+        self.__message_id += 1
+        message = {
+            'message_id': self.__message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': f'User {chat_id}'},
+            'from': self.user(chat_id),
+            'text': text,
+        }
+        if entities:
+            message['entities'] = entities
+        return message
+
+    def command(self, chat_id: int, command: str) -> dict:
+        text = f'/{command.lstrip("/")}'
+        return self.message(chat_id, text, [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}])
+
+    def query(self, chat_id: int, data: str) -> dict:
+        self.__query_id += 1
+        return {
+            'id': str(self.__query_id),
+            'from': self.user(chat_id),
+            'chat_instance': str(chat_id),
+            'data': data,
+            'message': {
+                'message_id': 0,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': {'id': 1, 'is_bot': True, 'first_name': self.username, 'username': self.username},
+            },
+        }
@@ -0,0 +1,304 @@
+## Standard Library
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque, Counter
+from functools import wraps
+
+## Local
+from ..botlib import stdout
+from ..aio.client import Client
+from ..data import Data
+from .server import FakeServer
+from .bench import Benchmark
+
+class Recorder(object):
+    """ Recorder(path: str)
+
+        Appends updates to `path`, one JSON object per line: a header
+        `{"username": ...}` with the bot's username when known, then
+        `{"time": ..., "update": {...}}` records, for `Replay`.
+
+        Records every update a bot receives with `TeleBot.record`, or those
+        reaching some handlers as a layer:
+
+        >>> RECORDER = Recorder('updates.jsonl')
+        >>> class MyBot(TeleBot):
+        ...     @RECORDER.layer
+        ...     @TeleBot.command('start')
+        ...     def start(self, update, context): ...
+
+        Updates reaching several handlers are written once.
+    """
+
+    ## Handler group of `TeleBot.record`, before any other
+    GROUP = -1
+
+    ## Update ids remembered, so that updates are written once
+    RECENT = 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+
+        self.__file = None
+        self.__lock = threading.Lock()
+        self.__recent = deque(maxlen=self.RECENT)
+
+    def write(self, update: object, username: str=None):
+        """ Writes `update`, an `Update` or its dictionary, now.
+        """
+        data = update.to_dict() if hasattr(update, 'to_dict') else update
+        line = json.dumps({'time': time.time(), 'update': data}, ensure_ascii=False)
+        with self.__lock:
+            update_id = data.get('update_id')
+            if update_id is not None:
+                if update_id in self.__recent:
+                    return
+                self.__recent.append(update_id)
+            if self.__file is None:
+                ## Line buffered, so that a crash loses at most the update being written
+                self.__file = open(self.path, 'a', encoding='utf-8', buffering=1)
+                if username is not None and self.__file.tell() == 0:
+                    self.__file.write(json.dumps({'username': username.lstrip('@')}) + '\n')
+            self.__file.write(line + '\n')
+            self.count += 1
+
+    def flush(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def layer(self) -> 'Layer':
+        """ Layer writing the update each handler it is added to is called with.
+        """
+        from ..layer import Layer
+        recorder = self
+
+        def decor(callback: callable):
+            @wraps(callback)
+            def new_callback(self, *args, **kwargs):
+                ## The first argument is the update, or its `Info` after `with_info`
+                update = getattr(args[0], 'update', args[0])
+                recorder.write(update, getattr(self, 'username', None))
+                return callback(self, *args, **kwargs)
+            return new_callback
+        decor.__qualname__ = f'{self.__class__.__name__}({self.path!r}).layer'
+        return Layer(decor)
+
+    @staticmethod
+    def read(path: str) -> tuple:
+        """ `(username, records)` from `path`, `records` being `(time, update)`
+            pairs in the order written.
+        """
+        username = None
+        records = []
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if 'update' in record:
+                    records.append((record.get('time', 0.0), record['update']))
+                elif 'username' in record:
+                    username = record['username']
+        return (username, records)
+
+class StubRequest(object):
+    """ Stands for `telegram.utils.request.Request`, answering calls from a
+        `FakeServer` in the same process.
+    """
+
+    def __init__(self, server: FakeServer):
+        self.server = server
+
+    def post(self, url: str, data: dict, timeout: float=None) -> object:
+        _, payload = self.server.call(None, url.rsplit('/', 1)[-1], dict(data or {}))
+        return payload['result']
+
+    def get(self, url: str, timeout: float=None) -> object:
+        return self.post(url, None, timeout)
+
+    def stop(self):
+        pass
+
+class StubClient(Client):
+    """ `Client` answering calls from a `FakeServer` in the same process.
+    """
+
+    def __init__(self, server: FakeServer):
+        Client.__init__(self, None)
+        self.server = server
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def call(self, method: str, **params) -> object:
+        params = {key: self.encode(value) for key, value in params.items() if value is not None}
+        _, payload = self.server.call(None, method, params)
+        return payload['result']
+
+class Replay(object):
+    """ Replay(bot_class: type, path: str, speed: float=None, workers: int=None, username: str=None, **options)
+
+        Replays updates written by a `Recorder` through a new `bot_class`
+        bot, `TeleBot` or `AsyncTeleBot`, handing them to its dispatcher
+        as fast as it takes them or, with `speed`, at their original pace
+        times `speed`. API calls are answered by a `FakeServer` in the same
+        process, nothing is sent over the network. `options` go to the
+        bot, `workers` to `start_workers`, or replace the `concurrency` of
+        async bots, and `username` replaces the one recorded. Each run
+        starts with empty chat data and no proxy results kept for `ttl`.
+
+        The report gives throughput and time spent handing each update
+        over, which, with workers or async bots, is not the time it takes
+        to handle it. API calls are counted by method and, in each chat's
+        order, hashed into `digest`: a change of digest between two runs
+        of a deterministic bot means its answers changed.
+
+        >>> before = Replay(MyBot, 'updates.jsonl').run()
+        >>> ... # change a proxy or filter
+        >>> after = Replay(MyBot, 'updates.jsonl').run()
+        >>> after['updates_per_sec'] / before['updates_per_sec'], after['digest'] == before['digest']
+    """
+
+    TOKEN = '123456:replay'
+
+    def __init__(self, bot_class: type, path: str, speed: float=None, workers: int=None, username: str=None, **options):
+        self.bot_class = bot_class
+        self.path = path
+        self.speed = speed
+        self.workers = workers
+        self.username = username
+        self.options = options
+
+    def run(self) -> dict:
+        """ Replays every update, returning the `report`.
+        """
+        username, records = Recorder.read(self.path)
+        server = FakeServer(username=self.username or username or 'fakebot')
+
+        ## Calls made, in each chat's order
+        self.calls = {}
+        self.handled = []
+        server.listeners.append(self.__on_call)
+
+        bot = self.bot_class(self.TOKEN, **self.options)
+        ## Nothing left by earlier runs, or by the bot's own data, may change its answers
+        bot.__data__ = Data()
+        self.bot_class.clear_proxies()
+        start = time.perf_counter()
+        if getattr(type(bot), 'asynchronous', False):
+            asyncio.run(self.replay_async(bot, server, records))
+        else:
+            self.replay(bot, server, records)
+        duration = time.perf_counter() - start
+
+        report = self.report(len(records), duration)
+        stdout[1] << "> {bot} replayed {updates} updates in {duration:.2f}s, {updates_per_sec:.1f}/s, {calls} calls".format(**report)
+        return report
+
+    def delay(self, start: float, first: float, at: float) -> float:
+        ## Seconds until the update recorded `at` is due, at `speed`
+        if not self.speed:
+            return 0.0
+        return (at - first) / self.speed - (time.perf_counter() - start)
+
+    def replay(self, bot: object, server: FakeServer, records: list):
+        from telegram import Update
+        ptb_bot = bot.updater.bot
+        ptb_bot._request = StubRequest(server)
+        if self.workers is not None:
+            bot.start_workers(self.workers)
+
+        start = time.perf_counter()
+        first = records[0][0] if records else 0.0
+        for at, data in records:
+            delay = self.delay(start, first, at)
+            if delay > 0:
+                time.sleep(delay)
+            update = Update.de_json(data, ptb_bot)
+            handled = time.perf_counter()
+            bot.dispatcher.process_update(update)
+            self.handled.append(time.perf_counter() - handled)
+        ## Waits for queued handlers
+        bot.stop_workers()
+
+    async def replay_async(self, bot: object, server: FakeServer, records: list):
+        bot.client = StubClient(server)
+        bot.me = await bot.client.get_me()
+        slots = asyncio.Semaphore(bot.concurrency if self.workers is None else self.workers)
+        tasks = []
+
+        async def process(data: dict):
+            try:
+                handled = time.perf_counter()
+                await bot.process(data)
+                self.handled.append(time.perf_counter() - handled)
+            finally:
+                slots.release()
+
+        start = time.perf_counter()
+        first = records[0][0] if records else 0.0
+        for at, data in records:
+            delay = self.delay(start, first, at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await slots.acquire()
+            tasks.append(asyncio.ensure_future(process(data)))
+        await asyncio.gather(*tasks)
+
+    def __on_call(self, method: str, params: dict, now: float):
+        if method in ('getMe', 'getMyCommands', 'getUpdates'):
+            return
+        ## Calls from different chats, or about different queries, may interleave
+        if 'chat_id' in params:
+            key = f"chat:{params['chat_id']}"
+        else:
+            key = f"query:{params.get('callback_query_id')}"
+        call = json.dumps([method, params], sort_keys=True, default=str)
+        self.calls.setdefault(key, []).append(call)
+
+    def report(self, updates: int, duration: float) -> dict:
+        """ `updates` replayed, per second, seconds to hand each over, as
+            average and percentiles, and API `calls`, also `by_method`,
+            with their `digest`.
+        """
+        handled = sorted(self.handled)
+        digest = hashlib.sha256()
+        methods = Counter()
+        for chat_id in sorted(self.calls):
+            for call in self.calls[chat_id]:
+                digest.update(call.encode('utf-8'))
+                methods[json.loads(call)[0]] += 1
+        return {
+            'bot': self.bot_class.__name__,
+            'updates': updates,
+            'duration': duration,
+            'updates_per_sec': (updates / duration) if duration else 0.0,
+            'handle_avg': (sum(handled) / len(handled)) if handled else 0.0,
+            'handle_p50': Benchmark.percentile(handled, 50),
+            'handle_p99': Benchmark.percentile(handled, 99),
+            'handle_max': handled[-1] if handled else 0.0,
+            'calls': sum(methods.values()),
+            'by_method': dict(methods),
+            'digest': digest.hexdigest(),
+        }
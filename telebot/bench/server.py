@@ -0,0 +1,215 @@
+## Standard Library
+import re
+import json
+import time
+import email
+import threading
+from collections import deque
+from urllib.parse import parse_qsl
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+class FakeServer(object):
+    """ FakeServer(listen: str='127.0.0.1', port: int=0, token: str=None, username: str='fakebot', latency: float=0.0)
+
+        Stand-in Bot API server, for running bots without Telegram. Point a
+        bot to its `url`, as in `TeleBot(token, url=server.url)`, and `push`
+        updates to it: they are answered to `getUpdates`. Calls that send,
+        edit or answer something get a plausible result, `getMe` returns a
+        bot named `username` and any other method returns `True`. Each call
+        takes `latency` more seconds, as a round trip to Telegram would.
+
+        Calls are given to each of `listeners` as `(method, params, time)`.
+        With `token`, other tokens are answered `401 Unauthorized`. With
+        `port=0`, a free port is chosen.
+
+        >>> with FakeServer() as server:
+        ...     bot = MyBot('123:abc', url=server.url)
+        ...     bot.run(idle=False)
+        ...     server.push({'message': {...}})
+    """
+
+    PATH = re.compile(r'/bot([^/]*)/(\w+)')
+
+    ## Seconds `getUpdates` waits at most, whatever asked
+    POLL_TIMEOUT = 10.0
+
+    def __init__(self, listen: str='127.0.0.1', port: int=0, token: str=None, username: str='fakebot', latency: float=0.0):
+        self.listen = listen
+        self.port = port
+        self.token = token
+        self.username = username
+        self.latency = latency
+
+        self.me = {'id': 1, 'is_bot': True, 'first_name': username, 'username': username}
+        self.listeners = []
+
+        ## Updates not yet confirmed by an offset, and the next update id
+        self.__updates = deque()
+        self.__update_id = 1
+        self.__message_id = 1
+        self.__cond = threading.Condition()
+        self.__closing = False
+
+        self.httpd = None
+        self.thread = None
+
+        self.methods = {
+            'getMe': lambda params: self.me,
+            'getUpdates': self.get_updates,
+            'getMyCommands': lambda params: [],
+            'getChat': lambda params: self.chat(params),
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.listen}:{self.port}"
+
+    def start(self) -> 'FakeServer':
+        server = self
+
+        class Handler(RequestHandler):
+            def call(self, token: str, method: str, params: dict) -> tuple:
+                return server.call(token, method, params)
+
+        self.httpd = ThreadingHTTPServer((self.listen, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='telebot-fake-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def release(self):
+        """ Answers pending and further `getUpdates` at once, so that bots
+            polling it stop quickly.
+        """
+        with self.__cond:
+            self.__closing = True
+            self.__cond.notify_all()
+
+    def stop(self):
+        self.release()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    ## Updates
+    def push(self, update: dict) -> int:
+        """ Makes `update` available to `getUpdates`, returning its `update_id`.
+        """
+        with self.__cond:
+            update_id = update['update_id'] = self.__update_id
+            self.__update_id += 1
+            self.__updates.append(update)
+            self.__cond.notify_all()
+        return update_id
+
+    def get_updates(self, params: dict) -> list:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + min(float(params.get('timeout') or 0), self.POLL_TIMEOUT)
+        with self.__cond:
+            while self.__updates and self.__updates[0]['update_id'] < offset:
+                self.__updates.popleft()
+            while not (self.__updates or self.__closing):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__cond.wait(remaining)
+            return [update for _, update in zip(range(limit), self.__updates)]
+
+    ## Calls
+    def call(self, token: str, method: str, params: dict) -> tuple:
+        """ `(status, payload)` answering `method`.
+        """
+        if self.token is not None and token != self.token:
+            return (401, {'ok': False, 'error_code': 401, 'description': 'Unauthorized'})
+        now = time.perf_counter()
+        for listener in self.listeners:
+            listener(method, params, now)
+        if self.latency and method != 'getUpdates':
+            time.sleep(self.latency)
+        if method in self.methods:
+            result = self.methods[method](params)
+        elif method.startswith(('send', 'edit', 'forward', 'copy')) and 'chat_id' in params:
+            result = self.message(params)
+        else:
+            result = True
+        return (200, {'ok': True, 'result': result})
+
+    def chat(self, params: dict) -> dict:
+        chat_id = params.get('chat_id')
+        chat_id = int(chat_id) if str(chat_id).lstrip('-').isdigit() else chat_id
+        return {'id': chat_id, 'type': 'private' if isinstance(chat_id, int) and chat_id > 0 else 'group'}
+
+    def message(self, params: dict) -> dict:
+        with self.__cond:
+            message_id = self.__message_id
+            self.__message_id += 1
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': self.chat(params),
+            'from': self.me,
+        }
+        for key in ('text', 'caption'):
+            if key in params:
+                message[key] = params[key]
+        return message
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """ Decodes `/bot<token>/<method>` requests for `FakeServer`, with
+        parameters given as a query string, form, multipart form or JSON.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    ## Headers and body are written apart, which would otherwise wait for delayed acks
+    disable_nagle_algorithm = True
+
+    def call(self, token: str, method: str, params: dict) -> tuple:
+        raise NotImplementedError
+
+    def do_GET(self):
+        self.answer(*self.route(dict(parse_qsl(self.path.partition('?')[2]))))
+
+    def do_POST(self):
+        self.answer(*self.route(self.params()))
+
+    def route(self, params: dict) -> tuple:
+        match = FakeServer.PATH.match(self.path)
+        if match is None:
+            return (404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+        return self.call(match.group(1), match.group(2), params)
+
+    def params(self) -> dict:
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        content_type = self.headers.get('Content-Type') or ''
+        if content_type.startswith('application/json'):
+            return json.loads(body or b'{}')
+        elif content_type.startswith('multipart/form-data'):
+            form = email.message_from_bytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+            params = {}
+            for part in form.get_payload():
+                name = part.get_param('name', header='content-disposition')
+                if name is not None and part.get_filename() is None:
+                    params[name] = part.get_payload(decode=True).decode('utf-8')
+            return params
+        else:
+            return dict(parse_qsl(body.decode('utf-8')))
+
+    def answer(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        pass
@@ -1 +1,5 @@
-from .bot import TeleBot
\ No newline at end of file
+from .bot import TeleBot
+from .info import Info
+from .pipeline import Pipeline
+from .keyboard import Keyboard
+from .payloads import Payloads
@@ -1,25 +1,37 @@
 ## Standard Library
 import re
-from functools import wraps, reduce
+import time
+import secrets
+from functools import wraps
 
 ## Third-Party
 from telegram import Update
-from telegram import ParseMode, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import ParseMode, InlineKeyboardMarkup
 from telegram.ext import Updater, Filters, CallbackContext
-from telegram.ext import MessageHandler, CommandHandler, InlineQueryHandler, CallbackQueryHandler
+from telegram.ext import MessageHandler, InlineQueryHandler, TypeHandler
 
 ## Local
 from ..proxy import Proxy
 from ..layer import Layer
 from ..botlib import stream, stdwar, stderr, stdout
 from ..data import Data
+from ..filters import FilterCompiler
+from .info import Info
+from .pipeline import Pipeline
+from .workers import Workers
+from .router import CommandRouter, QueryRouter
+from .keyboard import Keyboard
 
 class MetaTeleBot(type):
 
+    ## Whether handlers are compiled into coroutines
+    asynchronous = False
+
     def __new__(cls, name: str, bases: tuple, attrs: dict):
         attrs = cls.cast(attrs)
         attrs = cls.add_proxies(attrs)
         attrs = cls.add_layers(attrs)
+        attrs = cls.compile(attrs)
         attrs = cls.get_handlers(attrs)
         return super().__new__(cls, name, bases, attrs)
 
@@ -55,10 +67,6 @@ class MetaTeleBot(type):
                 else:
                     setattr(attr, 'proxy', bot_proxy.copy())
                 stdout[3] << f">> Add Proxies from {cls} to {attr}."
-            ## Apply proxy to function stack
-            if hasattr(attr, 'proxy'):
-                attr = Proxy.apply(attr)
-            attrs[name] = attr
         return attrs
 
     @classmethod
@@ -67,17 +75,25 @@ class MetaTeleBot(type):
         if has_layer: stdout[3] << f">> Broadcast Layers to handlers @{cls}"
         for name in attrs:
             attr = attrs[name]
-            ## Add eventual proxies
+            ## Add eventual layers
             if has_layer and hasattr(attr, 'handler'):
                 if hasattr(attr, 'layer'):
                     attr.layer = (bot_layer + attr.layer)
                 else:
                     setattr(attr, 'layer', bot_layer.copy())
                 stdout[3] << f">> Add Layers from {cls} to {attr}."
-            ## Apply layer to function stack
-            if hasattr(attr, 'layer'):
-                attr = Layer.apply(attr)
-            attrs[name] = attr
+        return attrs
+
+    @classmethod
+    def compile(cls, attrs: dict):
+        ## Proxy names checked first, in this order, instead of measured ordering
+        order = attrs.get('__order__', None)
+        for name in attrs:
+            attr = attrs[name]
+            ## Compile proxies and layers into a single function
+            if callable(attr) and (hasattr(attr, 'proxy') or hasattr(attr, 'layer')):
+                attrs[name] = Pipeline(attr, getattr(attr, 'proxy', None), getattr(attr, 'layer', None), order).compile(cls.asynchronous)
+                stdout[3] << f">> Compiled {attrs[name].pipeline} @{cls}"
         return attrs
 
     @classmethod
@@ -100,8 +116,8 @@ class MetaTeleBot(type):
                 ## Adds filters, the handler function and eventual key-word wargs
                 message_handlers.append((attr.filters, attr, attr.kw))
             if hasattr(attr, 'query_handler'):
-                ## Comment
-                query_handlers.append((attr, attr.pattern))
+                ## Adds the handler function and its keyboard key
+                query_handlers.append((attr, attr.key))
             if hasattr(attr, 'error_handler'):
                 ## Adds the latest defined error handler
                 error_handler = attr
@@ -120,6 +136,12 @@ class TeleBot(metaclass=MetaTeleBot):
 
     START_TEXT = 'Hello, human.'
 
+    ## Webhook defaults, see `start_webhook`
+    WEBHOOK_LISTEN = '127.0.0.1'
+    WEBHOOK_PORT = 8443
+    ## Seconds `start_webhook` waits at most for the server to listen
+    WEBHOOK_TIMEOUT = 10.0
+
     commands = []
     command_handlers = []
     message_handlers = []
@@ -128,16 +150,39 @@ class TeleBot(metaclass=MetaTeleBot):
 
     __data__ = Data()
 
-    def __init__(self, token=None, **options):
+    def __init__(self, token=None, workers: int=None, url: str=None, **options):
+        """ With `workers`, handlers run on that many threads instead of
+            the dispatcher's: updates from the same chat are handled one at
+            a time and in order, updates from different chats in parallel.
+            See `worker_stats`.
+
+            `url` points the bot to another Bot API server, such as a
+            local `FakeServer`.
+        """
         self.token = token
 
         ## Setup Updater
-        self.updater = Updater(token=self.token, use_context=True)
+        base_url = None if url is None else f"{url.rstrip('/')}/bot"
+        self.updater = Updater(token=self.token, base_url=base_url, use_context=True)
         stdout[1] << "> Updater setup"
 
         ## Retrieve Dispatcher
         self.dispatcher = self.updater.dispatcher
 
+        ## Message filters, shared by handlers
+        self.filter_compiler = FilterCompiler()
+
+        ## Setup Workers
+        self.workers = None
+        if workers is not None:
+            self.start_workers(workers)
+
+        ## Local address of the webhook, once started
+        self.webhook_url = None
+
+        ## Set by `record`
+        self.recorder = None
+
         ## Add Handlers
         self.add_handlers()
         stdout[1] << "> Handlers added"
@@ -148,45 +193,122 @@ class TeleBot(metaclass=MetaTeleBot):
             stdout[1] << "> Data Loaded"
         except FileNotFoundError:
             stderr[1] << "> Failed to load bot data. Creating new."
+        Keyboard.payloads.load(self.__data__.common)
 
     def save(self):
+        Keyboard.payloads.save(self.__data__.common)
         self.__data__.save(self.username)
 
     def clear(self):
         self.__data__.clear()
 
     def stop(self):
-        return self.updater.stop()
+        self.updater.stop()
+        self.stop_workers()
+
+    def start_workers(self, size: int):
+        """ Runs handlers on `size` threads from now on, see `__init__`.
+        """
+        if self.workers is not None:
+            raise RuntimeError(f"{len(self.workers)} workers already started.")
+        self.workers = Workers(size, errors=self.__worker_error)
+        self.workers.start()
+        stdout[1] << f"> {size} workers setup"
+
+    def stop_workers(self):
+        ## Updates from now on are handled inline, and workers may be started again
+        workers, self.workers = self.workers, None
+        if workers is not None:
+            workers.stop()
+            for stats in workers.stats():
+                stdout[3] << "> Worker {worker}: {handled} handled, max depth {max_depth}, wait avg {wait_avg:.4f}s max {wait_max:.4f}s".format(**stats)
+
+    def filter_stats(self) -> list:
+        """ Timing and rejection rate of each message filter, see `FilterCompiler.report`.
+        """
+        return self.filter_compiler.report()
+
+    @classmethod
+    def proxy_stats(cls) -> list:
+        """ Hit and miss counters, rejection rate and cost of each proxy
+            used by handlers, see `ProxyStats`. The order each handler
+            checks them in is shown by `pipelines`.
+        """
+        stats = {}
+        for pipeline in cls.pipelines().values():
+            for name, func in pipeline.proxy:
+                if hasattr(func, 'stats'):
+                    stats[id(func.stats)] = func.stats
+        return [stats.as_dict() for stats in stats.values()]
+
+    @classmethod
+    def clear_proxies(cls):
+        """ Forgets results kept by the proxies handlers use, for `ttl`.
+        """
+        for pipeline in cls.pipelines().values():
+            for name, func in pipeline.proxy:
+                if hasattr(func, 'clear'):
+                    func.clear()
+
+    def worker_stats(self) -> list:
+        """ Queue depth and wait time metrics of each worker, see `Workers.stats`.
+        """
+        return [] if self.workers is None else self.workers.stats()
 
     def main(self):
+        args = self.parse_args()
+        with self:
+            self.run(webhook=args.webhook, listen=args.listen, port=args.port, secret=args.secret, url=args.url, workers=args.workers)
+
+    def parse_args(self):
         import argparse
         parser = argparse.ArgumentParser(description=self.description)
         parser.add_argument(
             '--debug',
             dest='debug',
             type=int,
-            action='store_const',
             help='Set debug level (verbosity), from 0 to 5',
             default=0,
             choices=[0, 1, 2, 3, 4, 5],
             )
+        parser.add_argument(
+            '--webhook',
+            dest='webhook',
+            action='store_true',
+            help='Receive updates through a webhook instead of polling',
+            )
+        parser.add_argument('--listen', dest='listen', help='Webhook listen address')
+        parser.add_argument('--port', dest='port', type=int, help='Webhook listen port')
+        parser.add_argument('--secret', dest='secret', help='Webhook path secret, random by default')
+        parser.add_argument('--url', dest='url', help='Public webhook URL to register, without the secret')
+        parser.add_argument('--workers', dest='workers', type=int, help='Number of handler threads')
         args = parser.parse_args()
         stream.set_lvl(args.debug)
-        with self:
-            self.run()
+        return args
 
     @property
     def description(self):
         return "A Telegram Bot"
 
-    def run(self, idle=True):
+    def run(self, idle=True, webhook: bool=False, listen: str=None, port: int=None, secret: str=None, url: str=None, workers: int=None):
+        """ Polls for updates or, with `webhook`, serves them, see
+            `start_webhook`. With `workers`, starts that many handler
+            threads first.
+        """
         try:
-            self.updater.start_polling()
+            if workers is not None and self.workers is None:
+                self.start_workers(workers)
+            if webhook:
+                self.start_webhook(listen=listen, port=port, secret=secret, url=url)
+                mode = "Webhook"
+            else:
+                self.updater.start_polling()
+                mode = "Polling"
             if idle:
-                stdout[0] << "> Started Polling, going idle."
+                stdout[0] << f"> Started {mode}, going idle."
                 self.updater.idle()
             else:
-                stdout[0] << "> Started Polling."
+                stdout[0] << f"> Started {mode}."
         except KeyboardInterrupt:
             stderr[1] << "Keyboard Interrupt"
             return
@@ -194,10 +316,61 @@ class TeleBot(metaclass=MetaTeleBot):
             if idle:
                 if self.updater.running:
                     self.updater.stop()
+                self.stop_workers()
                 stdout[0] << "> Stopped"
             else:
                 stdout[0] << "> remember calling 'bot.stop()' aftewards."
 
+    def start_webhook(self, listen: str=None, port: int=None, secret: str=None, url: str=None) -> str:
+        """ Serves updates POSTed to `http://listen:port/secret`, feeding
+            them to the dispatcher, and returns that address. Defaults are
+            `WEBHOOK_LISTEN`, `WEBHOOK_PORT` and a random secret.
+
+            TLS is expected to end at a proxy in front of it. Given the
+            public `url` it is reached at, registers `url/secret` with
+            `setWebhook`; otherwise nothing is sent to Telegram, and
+            updates may be POSTed to it locally.
+        """
+        listen, port, secret = self.webhook_options(listen, port, secret)
+
+        self.updater.start_webhook(listen=listen, port=port, url_path=secret)
+        ## The server starts on a thread of its own, and can't be stopped before it listens
+        deadline = time.monotonic() + self.WEBHOOK_TIMEOUT
+        while getattr(self.updater.httpd, 'loop', None) is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Webhook server not listening on {listen}:{port} after {self.WEBHOOK_TIMEOUT}s.")
+            time.sleep(0.01)
+        if url is not None:
+            self.updater.bot.set_webhook(url=f"{url.rstrip('/')}/{secret}")
+            stdout[1] << f"> Webhook set at {url}"
+
+        self.webhook_url = f"http://{listen}:{port}/{secret}"
+        stdout[1] << f"> Webhook listening on {listen}:{port}"
+        return self.webhook_url
+
+    def record(self, recorder: object) -> object:
+        """ Writes every update received, before it is handled, to
+            `recorder`, a `telebot.bench.Recorder` or the path of its file,
+            to be replayed by `telebot.bench.Replay`.
+        """
+        from ..bench import Recorder
+        if not isinstance(recorder, Recorder):
+            recorder = Recorder(recorder)
+        self.recorder = recorder
+        self.dispatcher.add_handler(TypeHandler(Update, self.__record), group=Recorder.GROUP)
+        return recorder
+
+    def __record(self, update: Update, context: CallbackContext):
+        self.recorder.write(update, self.username)
+
+    @classmethod
+    def webhook_options(cls, listen: str=None, port: int=None, secret: str=None) -> tuple:
+        ## `(listen, port, secret)`, with defaults
+        listen = cls.WEBHOOK_LISTEN if listen is None else listen
+        port = cls.WEBHOOK_PORT if port is None else port
+        secret = secrets.token_urlsafe(24) if secret is None else secret.strip('/')
+        return (listen, port, secret)
+
     ## Context Management
     def __enter__(self, *args, **kwargs):
         self.load()
@@ -205,6 +378,7 @@ class TeleBot(metaclass=MetaTeleBot):
 
     def __exit__(self, *args, **kwargs):
         self.save()
+        self.__data__.close()
 
     ## Event Handlers
     def add_handlers(self):
@@ -214,25 +388,28 @@ class TeleBot(metaclass=MetaTeleBot):
         self.add_error_handler()
 
     def add_command_handlers(self):
+        ## One router per handler group, added before message handlers
+        routers = {}
         for command_name, callback, kwargs in self.command_handlers:
-            ## Create Handler Object
-            handler_kwargs = {key: kwargs[key] for key in kwargs if key != 'group'}
-            handler = CommandHandler(command_name, self.static(callback), **handler_kwargs)
+            group = kwargs.get('group', 0)
+            if group not in routers:
+                routers[group] = CommandRouter(self.updater.bot)
+                self.dispatcher.add_handler(routers[group], group=group)
 
-            ## Add Handler to Dispatcher
-            group_kwargs = {'group': kwargs['group']} if 'group' in kwargs else {}
-            self.dispatcher.add_handler(handler, **group_kwargs)
+            ## Add Command to Router
+            handler_kwargs = {key: kwargs[key] for key in kwargs if key != 'group'}
+            routers[group].add(command_name, self.ordered(callback), **handler_kwargs)
 
             stdout[3] << f"> Add Command Handler: /{command_name} @{callback}"
 
     def add_message_handlers(self):
         for filters, callback, kwargs in self.message_handlers:
-            ## AND filters together
-            filters = reduce(lambda x, y: x & y, filters)
+            ## AND filters together, ordered by cost and rejection rate
+            filters = self.filter_compiler.compile(filters)
 
             ## Create Handler Object
             handler_kwargs = {key: kwargs[key] for key in kwargs if key != 'group'}
-            handler = MessageHandler(filters, self.static(callback), **handler_kwargs)
+            handler = MessageHandler(filters, self.ordered(callback), **handler_kwargs)
 
             ## Add Handler to Dispatcher
             group_kwargs = {'group': kwargs['group']} if 'group' in kwargs else {}
@@ -241,13 +418,16 @@ class TeleBot(metaclass=MetaTeleBot):
             stdout[3] << f"> Add Message Handler: [{filters}] @{callback}"
 
     def add_query_handlers(self):
-        for callback, pattern in self.query_handlers:
-            handler = CallbackQueryHandler(self.static(callback), pattern=pattern)
+        router = QueryRouter()
+        for callback, key in self.query_handlers:
+            ## Add Query to Router
+            router.add(key, self.ordered(callback))
 
-            ## Add Handler to Dispatcher
-            self.dispatcher.add_handler(handler)
+            stdout[3] << f"> Add Query Handler: [{key}] @{callback}"
 
-            stdout[3] << f"> Add Message Handler: [{pattern}] @{callback}"
+        ## Add Router to Dispatcher
+        if len(router):
+            self.dispatcher.add_handler(router)
 
     def add_error_handler(self):
         for callback in self.error_handlers:
@@ -261,32 +441,35 @@ class TeleBot(metaclass=MetaTeleBot):
             return callback(self, update, context, **kwargs)
         return new_callback
 
-    def get_info(self, *args):
-        return args[0] if (len(args) == 1) else self._get_info(args[0], args[1])
+    def ordered(self, callback):
+        """ Like `static`, but with `workers` the callback is queued on the
+            worker of the update's chat, or user if it has no chat.
+        """
+        new_callback = self.static(callback)
 
-    def _get_info(self, update: Update, context) -> dict:
-        """ get_info(update, context) -> dict
-            This function is intended to gather the most relevant information
-            from these two objects into a single dictionary.
+        @wraps(callback)
+        def queue_callback(update, context):
+            ## Workers may be started after handlers are added, or stopped
+            workers = self.workers
+            if workers is None:
+                return new_callback(update, context)
+            chat, user = update.effective_chat, update.effective_user
+            key = chat.id if chat is not None else (user.id if user is not None else None)
+            workers.submit(key, new_callback, update, context)
+        return queue_callback
+
+    def __worker_error(self, key, args: tuple, error: Exception):
+        ## Errors raised on workers go to the dispatcher's error handlers
+        update, context = args
+        self.dispatcher.dispatch_error(update, error)
+
+    def get_info(self, *args) -> Info:
+        """ get_info(update, context) -> Info
+            Lazy mapping with the most relevant information from these two
+            objects, computed once per update; see `Info`. Given a single
+            argument, returns it: it is already the info.
         """
-        return  {
-            'error': context.error,
-            'chat': update.effective_chat,
-            'chat_id': update.effective_chat.id,
-            'type': update.effective_chat.type,
-            'title': update.effective_chat.title,
-            'message': update.message,
-            'message_id' : update.message.message_id,
-            'text': update.message.text,
-            'args': context.args,
-            'username': update.effective_user.username,
-            'name': update.effective_user.name,
-            'full_name': update.effective_user.full_name,
-            'query': update.callback_query,
-            'user': update.effective_user,
-            'user_id': update.effective_user.id,
-            'bot': context.bot,
-        }    
+        return args[0] if (len(args) == 1) else Info.of(args[0], args[1])
 
     def get_answer(self, text: str):
         """
@@ -299,6 +482,11 @@ class TeleBot(metaclass=MetaTeleBot):
         """
         return self.__data__.get_chat(chat_id)
 
+    def get_flags(self, chat_id: int) -> int:
+        """ Chat flags, see `Chat.STARTED` and `Chat.AWAKE`.
+        """
+        return self.__data__.get_flags(chat_id)
+
     ## command
     @classmethod
     def command(cls, command_name: str, description: str='', **kwargs: dict):
@@ -337,42 +525,27 @@ class TeleBot(metaclass=MetaTeleBot):
     @classmethod
     def keyboard_markup(cls, key:str, *rows) -> InlineKeyboardMarkup:
         """ keyboard_markup(key: str, *rows) -> InlineKeyboardMarkup
+            Cached by content; for keyboards that never change, declare a
+            class-level `Keyboard` instead.
 
             Example:
             >>> keyboard_markup("data-01",
                 ["Option1", "Option2"],
                 [("Pay!", {'pay': True})],
-                [("some fancy url", {'url': 'http://fancy.url'})]
+                [("some fancy url", {'url': 'http://fancy.url'})],
+                [("Move", {'payload': {'from': (0, 1), 'to': (2, 3)}})]
             )
 
         """
-        if re.match('[a-zA-Z][a-zA-Z0-9_-]+', key) is None:
-            raise ValueError(f"Key `{key}` doesn't match regex `[a-zA-Z][a-zA-Z0-9_-]+`.")
-
-        keyboard = []
-        for row in rows:
-            keyboard_row = []
-            for value in row:
-                if type(value) is str:
-                    button = InlineKeyboardButton(value, callback_data=f'{key}:{value}') 
-                elif type(value) is tuple and len(value) == 2:
-                    text, kwargs = value
-                    if 'data' in kwargs:
-                        data = kwargs['data']
-                    else:
-                        data = text
-                    assert type(text) is str and type(kwargs) is dict
-                    button = InlineKeyboardButton(text, callback_data=f'{key}:{data}', **kwargs)
-                else:
-                    raise ValueError("DOCUMENT ME PLEASE :'(")
-                    
-                keyboard_row.append(button)
-            keyboard.append(keyboard_row)
-        return InlineKeyboardMarkup(keyboard)
+        return Keyboard.markup(key, *rows)
 
     @classmethod
     def query(cls, key: str):
-        pattern = re.compile(f'\\b{key}\\b\\:(.+)')
+        """ callback(self, *args, data: object)
+            Handles callback queries from `keyboard_markup(key, ...)` buttons,
+            given the data after `key:`, or the button's payload object
+            (`None` once dropped from `Keyboard.payloads`).
+        """
         def decor(callback):
             if re.match('[a-zA-Z]+', key) is None:
                 raise ValueError(f"Key `{key}` doesn't match regex `[a-zA-Z]+`.")
@@ -380,14 +553,29 @@ class TeleBot(metaclass=MetaTeleBot):
             @wraps(callback)
             def new_callback(self, *args, **kwargs):
                 info = self.get_info(*args)
-                data = pattern.match(info['query'].data).group(1)
-                return callback(self, *args, data, **kwargs)
-                
+                return callback(self, *args, info['payload'], **kwargs)
+
+            setattr(new_callback, 'handler', True)
             setattr(new_callback, 'query_handler', True)
-            setattr(new_callback, 'pattern', pattern)
-            return callback
+            setattr(new_callback, 'key', key)
+            return new_callback
         return decor
 
+    @classmethod
+    def pipelines(cls) -> dict:
+        """ Compiled pipeline of each handler, by attribute name.
+
+            Example:
+            >>> for name, pipeline in MyBot.pipelines().items():
+            ...     print(name, pipeline.stages())
+        """
+        pipelines = {}
+        for name in dir(cls):
+            pipeline = getattr(getattr(cls, name, None), 'pipeline', None)
+            if isinstance(pipeline, Pipeline):
+                pipelines[name] = pipeline
+        return pipelines
+
     @property
     def name(self):
         return self.__class__.__name__
@@ -396,9 +584,19 @@ class TeleBot(metaclass=MetaTeleBot):
     def username(self):
         return self.updater.bot.name
 
+    def iter_cache(self, merge: bool=False, types: set=None, since: object=None, until: object=None):
+        """ iter_cache(merge: bool=False, types: set=None, since: datetime=None, until: datetime=None)
+            Lazily yields cached messages across all chats, see `Data.iter_messages`.
+
+            Example:
+            >>> for message in bot.iter_cache(merge=True, types={'group', 'supergroup'}):
+            ...     print(message.date, message.text)
+        """
+        return self.__data__.iter_messages(merge, types, since, until)
+
     @property
     def bot_cache(self):
-        return sum([chat.cache for chat in self.__data__.chats.values()], [])
+        return list(self.iter_cache())
 
     @property
     def command_list(self):
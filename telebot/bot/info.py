@@ -0,0 +1,110 @@
+## Standard Library
+from collections.abc import Mapping
+
+## Local
+from .keyboard import Keyboard
+
+def _attr(obj: object, *names: str) -> object:
+    ## Follows `names` from `obj`, stopping at the first `None`
+    for name in names:
+        if obj is None:
+            return None
+        obj = getattr(obj, name)
+    return obj
+
+def _data(update: object) -> str:
+    ## `data` of `key:data` callback queries, or `id` of `key#id` ones
+    data = _attr(update, 'callback_query', 'data')
+    return None if data is None else Keyboard.split(data)[2]
+
+def _payload(update: object) -> object:
+    ## Object stored for `key#id` callback queries, else as `_data`
+    data = _attr(update, 'callback_query', 'data')
+    if data is None:
+        return None
+    _, sep, data = Keyboard.split(data)
+    return data if sep == ':' else Keyboard.payloads.get(data)
+
+class Info(Mapping):
+    """ Info(update: Update, context: CallbackContext)
+
+        Read-only mapping with the most relevant information from an update
+        and its context. Each field is computed on first access and cached
+        on the update, so that proxies, layers and handlers reading it
+        while the same update is handled pay for it once.
+
+        Fields from the context (`error`, `args`, `bot`, `keywords`) are read from
+        the context given, which may differ between handlers. Fields that
+        do not apply to an update, such as `text` for a callback query,
+        are `None`. `data` is the callback query data after its key, as
+        made by `TeleBot.keyboard_markup`, and `payload` the object stored
+        for payload buttons, or the same as `data` for the others.
+    """
+
+    ## Fields read from the update, cached
+    FIELDS = {
+        'chat': lambda update: _attr(update, 'effective_chat'),
+        'chat_id': lambda update: _attr(update, 'effective_chat', 'id'),
+        'type': lambda update: _attr(update, 'effective_chat', 'type'),
+        'title': lambda update: _attr(update, 'effective_chat', 'title'),
+        'message': lambda update: _attr(update, 'message'),
+        'message_id': lambda update: _attr(update, 'message', 'message_id'),
+        'text': lambda update: _attr(update, 'message', 'text'),
+        'username': lambda update: _attr(update, 'effective_user', 'username'),
+        'name': lambda update: _attr(update, 'effective_user', 'name'),
+        'full_name': lambda update: _attr(update, 'effective_user', 'full_name'),
+        'query': lambda update: _attr(update, 'callback_query'),
+        'data': lambda update: _data(update),
+        'payload': lambda update: _payload(update),
+        'user': lambda update: _attr(update, 'effective_user'),
+        'user_id': lambda update: _attr(update, 'effective_user', 'id'),
+    }
+
+    ## Fields read from the context, never cached
+    CONTEXT = {
+        'error': lambda context: _attr(context, 'error'),
+        'args': lambda context: _attr(context, 'args'),
+        'bot': lambda context: _attr(context, 'bot'),
+        'keywords': lambda context: getattr(context, 'keywords', None),
+    }
+
+    ## Attribute holding the `Info` of an update
+    _ATTR = '_telebot_info'
+
+    @classmethod
+    def of(cls, update: object, context: object) -> 'Info':
+        """ The `Info` of `update`, created on first call and then shared
+            by every caller with the same context.
+        """
+        info = getattr(update, cls._ATTR, None)
+        if info is not None and info.context is context:
+            return info
+        info = cls(update, context, None if info is None else info.cache)
+        if update is not None:
+            setattr(update, cls._ATTR, info)
+        return info
+
+    def __init__(self, update: object, context: object, cache: dict=None):
+        self.update = update
+        self.context = context
+        self.cache = {} if cache is None else cache
+
+    def __getitem__(self, key: str) -> object:
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+        if key in self.CONTEXT:
+            return self.CONTEXT[key](self.context)
+        value = self.cache[key] = self.FIELDS[key](self.update)
+        return value
+
+    def __iter__(self):
+        yield from self.CONTEXT
+        yield from self.FIELDS
+
+    def __len__(self) -> int:
+        return len(self.CONTEXT) + len(self.FIELDS)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)!r})"
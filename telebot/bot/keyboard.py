@@ -0,0 +1,146 @@
+## Standard Library
+import re
+from collections import OrderedDict
+
+## Third-Party
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+## Local
+from .payloads import Payloads
+
+class Keyboard(object):
+    """ Keyboard(key: str, *rows)
+
+        Inline keyboard whose buttons answer `key:data` callback queries,
+        handled by `TeleBot.query(key)`. Each row is a list of button texts,
+        which are also their data, or `(text, kwargs)` pairs, where
+        `kwargs['data']` replaces the data and the others are passed to
+        `InlineKeyboardButton`. With `kwargs['payload']`, the button
+        carries `key#id` instead, and the handler is given the payload
+        object, kept in `Keyboard.payloads` (see `Payloads`).
+
+        Declared as a class attribute, it is built once when the class is
+        created, and reads as the `InlineKeyboardMarkup`:
+
+        >>> class GuguGame(Game):
+        ...     OBJETO = Keyboard('objeto', [('Sim', {'data': True}), ('Não', {'data': False})])
+        ...     def ask(self):
+        ...         self.bot.send_message(chat_id=self.chat_id, text='?', reply_markup=self.OBJETO)
+
+        Keyboards built by `markup` are cached by content, at most
+        `CACHE_SIZE`, unless they have payloads. Built keyboards are
+        `Markup`s, which serialize once.
+    """
+
+    KEY = re.compile('[a-zA-Z][a-zA-Z0-9_-]+')
+    ## Any key that `TeleBot.query` takes, followed by a separator
+    SPLIT = re.compile('[a-zA-Z][a-zA-Z0-9_-]*')
+
+    CACHE_SIZE = 1024
+    __cache = OrderedDict()
+
+    ## Payloads of every keyboard
+    payloads = Payloads()
+
+    def __init__(self, key: str, *rows):
+        self.validate(key)
+        self.key = key
+        self.rows = rows
+        self.__markup = None
+
+    @classmethod
+    def validate(cls, key: str):
+        if cls.KEY.match(key) is None:
+            raise ValueError(f"Key `{key}` doesn't match regex `{cls.KEY.pattern}`.")
+
+    @classmethod
+    def split(cls, data: str) -> tuple:
+        """ `(key, sep, data)` of callback data, `sep` being `:` for plain
+            data, `Payloads.SEP` for payload ids and `''` for neither.
+        """
+        match = cls.SPLIT.match(data or '')
+        if match is None:
+            return (data, '', '')
+        end = match.end()
+        sep = data[end:end + 1]
+        if sep == ':' or sep == Payloads.SEP:
+            return (data[:end], sep, data[end + 1:])
+        return (data, '', '')
+
+    def __set_name__(self, owner: type, name: str):
+        self.__markup = self.build(self.key, self.rows, pin=True)
+
+    def __get__(self, obj: object, owner: type=None) -> InlineKeyboardMarkup:
+        if self.__markup is None:
+            self.__markup = self.build(self.key, self.rows, pin=True)
+        return self.__markup
+
+    @classmethod
+    def markup(cls, key: str, *rows) -> InlineKeyboardMarkup:
+        """ Builds the keyboard, or returns the one built with the same content.
+        """
+        cls.validate(key)
+        content = (key, repr(rows))
+        if ' at 0x' in content[1]:
+            ## Objects without a repr of their own are not cached
+            return cls.build(key, rows)
+
+        try:
+            cls.__cache.move_to_end(content)
+            return cls.__cache[content]
+        except KeyError:
+            markup = cls.build(key, rows)
+            if markup._payloads:
+                ## Rebuilt every time, so that payloads are stored again
+                return markup
+            cls.__cache[content] = markup
+            while len(cls.__cache) > cls.CACHE_SIZE:
+                cls.__cache.popitem(last=False)
+            return markup
+
+    @classmethod
+    def build(cls, key: str, rows: tuple, pin: bool=False) -> InlineKeyboardMarkup:
+        keyboard = []
+        payloads = 0
+        for row in rows:
+            keyboard_row = []
+            for value in row:
+                if type(value) is str:
+                    button = InlineKeyboardButton(value, callback_data=f'{key}:{value}')
+                elif type(value) is tuple and len(value) == 2:
+                    text, kwargs = value
+                    if type(text) is not str or type(kwargs) is not dict:
+                        raise ValueError(f"Button `{value}` is not a `(text: str, kwargs: dict)` pair.")
+                    if 'payload' in kwargs:
+                        callback_data = f"{key}{Payloads.SEP}{cls.payloads.put(kwargs['payload'], pin=pin)}"
+                        payloads += 1
+                    else:
+                        callback_data = f"{key}:{kwargs.get('data', text)}"
+                    kwargs = {name: kwargs[name] for name in kwargs if name not in ('data', 'payload')}
+                    button = InlineKeyboardButton(text, callback_data=callback_data, **kwargs)
+                else:
+                    raise ValueError(f"Button `{value}` is neither a text nor a `(text, kwargs)` pair.")
+                keyboard_row.append(button)
+            keyboard.append(keyboard_row)
+        markup = Markup(keyboard)
+        markup._payloads = payloads
+        return markup
+
+class Markup(InlineKeyboardMarkup):
+    """ `InlineKeyboardMarkup` that serializes once, to be shared and sent
+        many times. It must not be changed once sent.
+    """
+
+    def to_dict(self) -> dict:
+        try:
+            return self.__dict
+        except AttributeError:
+            self.__dict = InlineKeyboardMarkup.to_dict(self)
+            return self.__dict
+
+    def to_json(self) -> str:
+        try:
+            return self.__json
+        except AttributeError:
+            self.__json = InlineKeyboardMarkup.to_json(self)
+            return self.__json
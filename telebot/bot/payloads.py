@@ -0,0 +1,108 @@
+## Standard Library
+import base64
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+class Payloads(object):
+    """ Payloads(size: int=4096, persist: bool=False)
+
+        Store of callback query payloads, for buttons made with
+        `(text, {'payload': obj})`: the button carries `key#id` as its
+        callback data, and `obj` stays here, so the `query` handler is
+        given `obj` itself. Any picklable object may be used, no matter
+        its size.
+
+        Ids are digests of the pickled payload, so that equal payloads
+        share an entry and ids stay valid across restarts. At most `size`
+        payloads are kept, the least recently used are dropped; queries
+        whose payload was dropped get `None`. Payloads of class-level
+        `Keyboard`s are pinned and never dropped.
+
+        With `persist`, payloads are saved in `Data.common` along with
+        the bot data.
+    """
+
+    ## Separator between key and id in callback data
+    SEP = '#'
+    ## Entry of `Data.common` holding persisted payloads
+    COMMON = 'payloads'
+
+    def __init__(self, size: int=4096, persist: bool=False):
+        self.size = size
+        self.persist = persist
+
+        ## id -> payload
+        self.__cache = OrderedDict()
+        self.__pinned = {}
+        self.__lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(payload: object) -> str:
+        try:
+            dump = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as error:
+            raise ValueError(f"Payload `{payload!r}` can't be pickled: {error}")
+        return base64.urlsafe_b64encode(hashlib.blake2b(dump, digest_size=9).digest()).decode('ascii')
+
+    def put(self, payload: object, pin: bool=False) -> str:
+        """ Stores `payload`, returning its id.
+        """
+        id = self.digest(payload)
+        with self.__lock:
+            if pin:
+                self.__pinned[id] = payload
+            elif id not in self.__pinned:
+                self.__cache[id] = payload
+                self.__cache.move_to_end(id)
+                while len(self.__cache) > self.size:
+                    self.__cache.popitem(last=False)
+        return id
+
+    def get(self, id: str, default: object=None) -> object:
+        with self.__lock:
+            if id in self.__pinned:
+                self.hits += 1
+                return self.__pinned[id]
+            try:
+                self.__cache.move_to_end(id)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self.__cache[id]
+
+    def __contains__(self, id: str) -> bool:
+        return id in self.__pinned or id in self.__cache
+
+    def __len__(self) -> int:
+        return len(self.__pinned) + len(self.__cache)
+
+    def load(self, common: dict):
+        """ Restores payloads saved by `save`, if persisted, keeping those
+            stored since.
+        """
+        if not self.persist:
+            return
+        with self.__lock:
+            saved = OrderedDict(common.get(self.COMMON, ()))
+            saved.update(self.__cache)
+            self.__cache = saved
+            while len(self.__cache) > self.size:
+                self.__cache.popitem(last=False)
+
+    def save(self, common: dict):
+        """ Writes payloads to `common`, if persisted.
+        """
+        if not self.persist:
+            return
+        with self.__lock:
+            common[self.COMMON] = list(self.__cache.items())
+
+    def clear(self):
+        with self.__lock:
+            self.__cache.clear()
@@ -0,0 +1,156 @@
+## Standard Library
+from inspect import isawaitable
+from functools import update_wrapper
+
+## Local
+from ..botlib import stdout
+
+class Pipeline(object):
+    """ Pipeline(callback: callable, proxy: dict=None, layer: list=None, order: list=None)
+
+        What runs when a handler is called, compiled by `MetaTeleBot`
+        into a single function: layers from the last to the first, then
+        the proxies, then the callback.
+
+        Layers built with `Layer.args` only rewrite the arguments, and
+        consecutive ones are fused into that function, along with the
+        proxy predicates, checked in order from a tuple. Other layers
+        keep wrapping it, as decorators.
+
+        Every `REORDER` calls, proxies are sorted by their measured cost
+        per rejection (see `ProxyStats`), so that cheap proxies rejecting
+        most updates run first. An `order` of proxy names, as given by a
+        bot's `__order__`, pins those first and turns sorting off, as
+        does `set_order`.
+
+        Compiled with `asynchronous`, the function is a coroutine, and
+        layers, proxies and the callback may return awaitables, which
+        are awaited.
+    """
+
+    REORDER = 256
+
+    def __init__(self, callback: callable, proxy: dict=None, layer: list=None, order: list=None):
+        self.callback = callback
+        self.proxy = tuple((proxy or {}).items())
+        self.layer = list(layer or ())
+
+        ## Current predicates and calls since last sorted, shared with the compiled function
+        self.__checks = [tuple(pred for _, pred in self.proxy), 0]
+
+        self.adaptive = True
+        self.reorders = 0
+        if order is not None:
+            self.set_order(order)
+
+    def compile(self, asynchronous: bool=False) -> callable:
+        fuse = self._fuse_async if asynchronous else self._fuse
+        func = self.callback
+        checks = self.__checks if self.proxy else None
+        prepares = ()
+        ## Async layers must wrap a coroutine function
+        core = asynchronous
+        for decor in self.layer:
+            prepare = getattr(decor, 'prepare', None)
+            if prepare is not None:
+                ## Layers later in the list run first
+                prepares = (prepare,) + prepares
+                continue
+            if checks or prepares or core:
+                func = fuse(func, prepares, checks)
+                prepares, checks = (), None
+                core = False
+            func = update_wrapper(decor(func), func)
+        if checks or prepares or core or func is self.callback:
+            func = fuse(func, prepares, checks)
+        func.pipeline = self
+        return func
+
+    def _count(self):
+        self.__checks[1] += 1
+        if self.__checks[1] >= self.REORDER:
+            self.__checks[1] = 0
+            if self.adaptive:
+                self.reorder()
+
+    def _fuse(self, callback: callable, prepares: tuple, checks: list) -> callable:
+        def pipeline(bot, *args, **kwargs):
+            for prepare in prepares:
+                args = prepare(bot, *args)
+            if checks:
+                self._count()
+                info = bot.get_info(*args)
+                for pred in checks[0]:
+                    if not pred(bot, info):
+                        return None
+            return callback(bot, *args, **kwargs)
+        update_wrapper(pipeline, callback)
+        pipeline.__dict__.pop('pipeline', None)
+        return pipeline
+
+    def _fuse_async(self, callback: callable, prepares: tuple, checks: list) -> callable:
+        async def pipeline(bot, *args, **kwargs):
+            for prepare in prepares:
+                args = prepare(bot, *args)
+                if isawaitable(args):
+                    args = await args
+            if checks:
+                self._count()
+                info = bot.get_info(*args)
+                for pred in checks[0]:
+                    allow = pred(bot, info)
+                    if isawaitable(allow):
+                        allow = await allow
+                    if not allow:
+                        return None
+            result = callback(bot, *args, **kwargs)
+            if isawaitable(result):
+                result = await result
+            return result
+        update_wrapper(pipeline, callback)
+        pipeline.__dict__.pop('pipeline', None)
+        return pipeline
+
+    @staticmethod
+    def score(pred: callable) -> float:
+        stats = getattr(pred, 'stats', None)
+        return 0.0 if stats is None else stats.score
+
+    def reorder(self) -> bool:
+        """ Sorts the proxies by measured cost per rejection, returning
+            whether their order changed.
+        """
+        proxy = tuple(sorted(self.proxy, key=lambda item: self.score(item[1])))
+        if proxy == self.proxy:
+            return False
+        stdout[3] << f"> Reordered proxies @{self.callback.__qualname__}: {', '.join(name for name, _ in proxy)}"
+        self.__set(proxy)
+        self.reorders += 1
+        return True
+
+    def set_order(self, names: list):
+        """ Checks the proxies named first, in the order given, followed by
+            the others, and stops sorting them.
+        """
+        rank = {name: index for index, name in enumerate(names)}
+        self.__set(tuple(sorted(self.proxy, key=lambda item: rank.get(item[0], len(rank)))))
+        self.adaptive = False
+
+    def __set(self, proxy: tuple):
+        self.proxy = proxy
+        self.__checks[0] = tuple(pred for _, pred in proxy)
+
+    def stages(self) -> list:
+        """ Names of the stages, in the order they run.
+        """
+        stages = []
+        for decor in reversed(self.layer):
+            kind = 'args' if hasattr(decor, 'prepare') else 'layer'
+            stages.append(f'{kind}:{getattr(decor, "__qualname__", repr(decor))}')
+        for name, _ in self.proxy:
+            stages.append(f'proxy:{name}')
+        stages.append(f'call:{self.callback.__qualname__}')
+        return stages
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({' -> '.join(self.stages())})"
@@ -0,0 +1,99 @@
+## Standard Library
+import re
+
+## Third-Party
+from telegram import Update, MessageEntity
+from telegram.ext import Handler, Filters
+
+## Local
+from .keyboard import Keyboard
+
+def parse_command(message: object, username: str) -> tuple:
+    """ parse_command(message: Message, username: str) -> (command, args) or None
+
+        Reads a message starting with a command, as `CommandHandler` does:
+        `/command@username arg ...`, lower cased, with `@username` optional
+        and required to match the bot's `username` when given.
+    """
+    entities = message.entities
+    if not (entities and entities[0].type == MessageEntity.BOT_COMMAND and entities[0].offset == 0):
+        return None
+    command, _, target = message.text[1:entities[0].length].partition('@')
+    if target and target.lower() != username.lower():
+        return None
+    return (command.lower(), message.text.split()[1:])
+
+class CommandRouter(Handler):
+    """ CommandRouter(bot: telegram.Bot)
+
+        Single handler for every command of a bot: the command is parsed
+        once and its callback looked up by name. Updates that are not one
+        of its commands are left to the next handlers, such as message
+        handlers. `context.args` is set as by `CommandHandler`.
+    """
+
+    COMMAND = re.compile(r'^[\da-z_]{1,32}$')
+
+    def __init__(self, bot: object):
+        Handler.__init__(self, None)
+        self.bot = bot
+        ## command -> (callback, filters)
+        self.commands = {}
+
+    def add(self, command: str, callback: callable, filters: Filters=None, allow_edited: bool=None, **kwargs):
+        """ Accepts the keyword arguments of `CommandHandler`; `pass_*` ones are ignored.
+        """
+        command = command.lower()
+        if self.COMMAND.match(command) is None:
+            raise ValueError(f'Command `{command}` is not a valid bot command.')
+        filters = Filters.update.messages if not filters else (Filters.update.messages & filters)
+        if allow_edited is False:
+            filters &= ~Filters.update.edited_message
+        self.commands[command] = (callback, filters)
+
+    def check_update(self, update: Update) -> object:
+        if not isinstance(update, Update) or not update.effective_message:
+            return None
+        parsed = parse_command(update.effective_message, self.bot.username)
+        if parsed is None or parsed[0] not in self.commands:
+            return None
+        command, args = parsed
+        callback, filters = self.commands[command]
+        return (callback, args) if filters(update) else False
+
+    def handle_update(self, update: Update, dispatcher: object, check_result: tuple, context: object=None):
+        callback, args = check_result
+        context.args = args
+        return callback(update, context)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+class QueryRouter(Handler):
+    """ QueryRouter()
+
+        Single handler for the callback queries of a bot, with data
+        `key:data` or `key#id` as made by `TeleBot.keyboard_markup`: the callback is
+        looked up by `key`. Queries with other keys are left to the next
+        handlers.
+    """
+
+    def __init__(self):
+        Handler.__init__(self, None)
+        ## key -> callback
+        self.keys = {}
+
+    def add(self, key: str, callback: callable):
+        self.keys[key] = callback
+
+    def check_update(self, update: Update) -> object:
+        if not isinstance(update, Update) or update.callback_query is None:
+            return None
+        key, sep, _ = Keyboard.split(update.callback_query.data)
+        return self.keys.get(key) if sep else None
+
+    def handle_update(self, update: Update, dispatcher: object, check_result: callable, context: object=None):
+        return check_result(update, context)
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -0,0 +1,104 @@
+## Standard Library
+import time
+import queue
+import threading
+import traceback
+
+## Local
+from ..botlib import stderr
+
+class Worker(threading.Thread):
+    """ Worker(index: int, errors: callable=None)
+
+        Thread running calls from its queue in order. Keeps the time calls
+        waited in the queue and the deepest the queue has been.
+    """
+
+    def __init__(self, index: int, errors: callable=None):
+        threading.Thread.__init__(self, name=f'telebot-worker-{index}', daemon=True)
+        self.index = index
+        self.errors = errors
+
+        self.queue = queue.Queue()
+
+        self.handled = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def put(self, key: object, func: callable, args: tuple):
+        self.queue.put((time.perf_counter(), key, func, args))
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            start, key, func, args = item
+            wait = time.perf_counter() - start
+            self.handled += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            try:
+                func(*args)
+            except Exception as error:
+                if self.errors is not None:
+                    self.errors(key, args, error)
+                else:
+                    for line in traceback.format_tb(error.__traceback__):
+                        stderr[1] << line
+                    stderr[1] << f"> Worker {self.index} failed: {error}"
+
+    def stats(self) -> dict:
+        return {
+            'worker': self.index,
+            'depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'handled': self.handled,
+            'wait_avg': (self.total_wait / self.handled) if self.handled else 0.0,
+            'wait_max': self.max_wait,
+        }
+
+    def stop(self):
+        self.queue.put(None)
+
+class Workers(object):
+    """ Workers(size: int, errors: callable=None)
+
+        Pool of `size` threads, each with its own queue. Calls submitted
+        with the same key, such as a chat_id, go to the same queue and run
+        one at a time in the order submitted; calls with different keys
+        run in parallel.
+
+        `errors(key, args, error)` is called with exceptions raised by calls.
+    """
+
+    def __init__(self, size: int, errors: callable=None):
+        self.workers = [Worker(index, errors) for index in range(size)]
+
+    def start(self):
+        for worker in self.workers:
+            if not worker.is_alive():
+                worker.start()
+
+    def submit(self, key: object, func: callable, *args):
+        self.workers[hash(key) % len(self.workers)].put(key, func, args)
+
+    def stats(self) -> list:
+        """ Per worker: current and maximum queue `depth`, calls `handled`,
+            and the average and maximum seconds they waited queued.
+        """
+        return [worker.stats() for worker in self.workers]
+
+    def stop(self):
+        """ Waits for queued calls to finish, then stops the threads.
+        """
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            if worker.is_alive():
+                worker.join()
+
+    def __len__(self) -> int:
+        return len(self.workers)
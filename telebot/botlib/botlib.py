@@ -1,4 +1,5 @@
 ## Standard Library
+import os
 import pickle
 import io
 import random
@@ -14,8 +15,13 @@ def pkload(fname: str) -> object:
         return pickle.load(file)
 
 def pkdump(fname: str, obj: object) -> None:
-    with open(fname, 'wb') as file:
-        return pickle.dump(obj, file)
+    ## Write aside and rename, so `fname` is never left half-written
+    temp = f'{fname}.tmp'
+    with open(temp, 'wb') as file:
+        pickle.dump(obj, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, fname)
 
 def load(fname: str) -> str:
     with open(fname, 'r') as file:
@@ -1 +1,2 @@
-from .chat import Chat
\ No newline at end of file
+from .chat import Chat
+from .cache import Cache, CacheView
\ No newline at end of file
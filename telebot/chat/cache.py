@@ -0,0 +1,89 @@
+## Standard Library
+import sys
+from collections import deque
+from collections.abc import Sequence
+
+def sizeof(message: object) -> int:
+    ## Rough footprint: the object itself plus its text, if any
+    text = getattr(message, 'text', None)
+    return sys.getsizeof(message) + (sys.getsizeof(text) if text else 0)
+
+class Cache(object):
+    """ Cache(size: int, nbytes: int=None, sizeof: callable=sizeof)
+
+        Ring buffer of the last `size` messages. With `nbytes`, the oldest
+        messages are also dropped until the `sizeof` of the others fits.
+    """
+
+    def __init__(self, size: int, nbytes: int=None, sizeof: callable=sizeof, items: list=()):
+        self.size = size
+        self.nbytes = nbytes
+        self.sizeof = sizeof
+
+        self.__items = deque(maxlen=size)
+        self.__sizes = deque(maxlen=size)
+        self.__used = 0
+
+        for item in items:
+            self.append(item)
+
+    def append(self, item: object) -> None:
+        if self.nbytes is None:
+            self.__items.append(item)
+            return
+
+        if len(self.__items) == self.size:
+            self.__items.popleft()
+            self.__used -= self.__sizes.popleft()
+
+        size = self.sizeof(item)
+        while self.__items and self.__used + size > self.nbytes:
+            self.__items.popleft()
+            self.__used -= self.__sizes.popleft()
+
+        self.__items.append(item)
+        self.__sizes.append(size)
+        self.__used += size
+
+    def copy(self) -> 'Cache':
+        return self.__class__(self.size, self.nbytes, self.sizeof, self.__items)
+
+    def view(self) -> 'CacheView':
+        return CacheView(self.__items)
+
+    @property
+    def used(self) -> int:
+        """ Bytes in use, as measured by `sizeof`; only tracked with `nbytes`.
+        """
+        return self.__used
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def __iter__(self):
+        return iter(self.__items)
+
+class CacheView(Sequence):
+    """ Read-only, non-copying view of a `Cache`, oldest message first.
+        Like a `deque`, iterating while messages are added raises `RuntimeError`.
+    """
+
+    def __init__(self, items: deque):
+        self.__items = items
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def __getitem__(self, index: int) -> object:
+        if isinstance(index, slice):
+            return [self.__items[i] for i in range(*index.indices(len(self.__items)))]
+        return self.__items[index]
+
+    def __iter__(self):
+        return iter(self.__items)
+
+    def __reversed__(self):
+        return reversed(self.__items)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self.__items)!r})"
@@ -1,45 +1,229 @@
-from ..game import Game
+## Standard Library
+import pickle
+import struct
+from contextlib import nullcontext
+
+## Local
+from .cache import Cache
 
 class Chat(object):
+    """ Chat(chat_id: int)
+
+        Persisted with `encode`, a versioned binary layout:
+        magic `C`, format, chat_id, flags, version and the sequence number
+        of the last journal record applied (`lsn`), followed by the pickled
+        message cache, which is only unpickled on first use.
+        Chats pickled by earlier versions are still read by `decode`
+        and by `pickle`.
+
+        `copy.copy` is copy-on-write: the copy shares the message cache,
+        which is only duplicated by the next `save` on either chat.
+    """
+
+    __slots__ = ('__chat_id', '__flags', '__version', '__lsn', '__cache', '__shared', '__listener', '__lock', '__weakref__')
+
+    ## Methods that change chat state, replayed from the journal
+    OPS = {'start', 'save', 'sleep', 'wakeup'}
+
+    ## Messages kept by `save`, at most `CACHE_SIZE` and, if set, `CACHE_BYTES`
+    CACHE_SIZE = 1024
+    CACHE_BYTES = None
+
+    ## Flags
+    STARTED = 0x01
+    AWAKE = 0x02
+
+    ## Encoding: magic, format, chat_id, flags, version, lsn
+    MAGIC = b'C'
+    FORMAT = 2
+    HEADER = struct.Struct('<cBqBQQ')
+    ## Earlier formats, without lsn
+    HEADERS = {1: struct.Struct('<cBqBQ'), 2: HEADER}
 
     def __init__(self, chat_id: int):
         self.__chat_id = chat_id
-        self.__started = False
-        self.__awake = True
+        self.__flags = self.AWAKE
+
+        ## Bumped by every state change
+        self.__version = 0
+        ## Set by `Data` to the journal record of the last change
+        self.__lsn = 0
+
+        ## Either a `Cache` or, until first used, its encoded bytes
+        self.__cache = Cache(self.CACHE_SIZE, self.CACHE_BYTES)
+        ## Whether `__cache` is shared with a copy
+        self.__shared = False
+
+        self.__listener = None
+        self.__lock = nullcontext()
+
+    def encode(self) -> bytes:
+        with self.__lock:
+            header = self.HEADER.pack(self.MAGIC, self.FORMAT, self.__chat_id, self.__flags, self.__version, self.__lsn)
+            if type(self.__cache) is bytes:
+                return header + self.__cache
+            elif not len(self.__cache):
+                return header
+            else:
+                return header + pickle.dumps(list(self.__cache), pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def decode(cls, blob: bytes) -> 'Chat':
+        if blob[:1] != cls.MAGIC:
+            ## Pickled by an earlier version
+            return pickle.loads(blob)
+
+        format = blob[1]
+        if format not in cls.HEADERS:
+            raise ValueError(f'Unknown chat encoding format `{format}`.')
+        header = cls.HEADERS[format]
+        magic, format, chat_id, flags, version, *lsn = header.unpack_from(blob)
+
+        chat = cls.__new__(cls)
+        chat.__chat_id = chat_id
+        chat.__flags = flags
+        chat.__version = version
+        chat.__lsn = lsn[0] if lsn else 0
+        chat.__cache = blob[header.size:]
+        chat.__shared = False
+        chat.__listener = None
+        chat.__lock = nullcontext()
+        return chat
+
+    @classmethod
+    def decode_flags(cls, blob: bytes) -> int:
+        """ Flags of an encoded chat, read from its first bytes only.
+            `None` for chats pickled by an earlier version.
+        """
+        if blob[:1] != cls.MAGIC:
+            return None
+        return cls.HEADERS[blob[1]].unpack_from(blob)[3]
 
-        self.__cache = []
+    def __reduce__(self):
+        return (self.__class__.decode, (self.encode(),))
+
+    def __copy__(self):
+        with self.__lock:
+            chat = self.__class__.__new__(self.__class__)
+            chat.__chat_id = self.__chat_id
+            chat.__flags = self.__flags
+            chat.__version = self.__version
+            chat.__lsn = self.__lsn
+            chat.__cache = self.__cache
+            chat.__shared = self.__shared = True
+            chat.__listener = None
+            chat.__lock = nullcontext()
+            return chat
+
+    def __setstate__(self, state: dict):
+        ## Chats pickled before `encode`, with name-mangled attributes
+        flags = 0
+        if state.get('_Chat__started', False):
+            flags |= self.STARTED
+        if state.get('_Chat__awake', True):
+            flags |= self.AWAKE
+        self.__chat_id = state['_Chat__chat_id']
+        self.__flags = flags
+        self.__version = state.get('_Chat__version', 0)
+        self.__lsn = 0
+        self.__cache = Cache(self.CACHE_SIZE, self.CACHE_BYTES, items=state.get('_Chat__cache', ()))
+        self.__shared = False
+        self.__listener = None
+        self.__lock = nullcontext()
+
+    def __messages(self) -> Cache:
+        with self.__lock:
+            if type(self.__cache) is bytes:
+                items = pickle.loads(self.__cache) if self.__cache else ()
+                self.__cache = Cache(self.CACHE_SIZE, self.CACHE_BYTES, items=items)
+                self.__shared = False
+            return self.__cache
+
+    def listen(self, listener: callable, lock: object=None) -> None:
+        """ listener(chat: Chat, op: str, *args) -> None
+            Called after every state change, with the name of the method
+            and its arguments. Both the change and the call happen while
+            holding `lock`, if given.
+        """
+        self.__listener = listener
+        self.__lock = nullcontext() if lock is None else lock
+
+    def notify(self, op: str, *args) -> None:
+        self.__version += 1
+        if self.__listener is not None:
+            self.__listener(self, op, *args)
 
     def start(self):
-        self.__started = True
+        with self.__lock:
+            self.__flags |= self.STARTED
+            self.notify('start')
 
     def save(self, message):
-        self.__cache.append(message)
+        with self.__lock:
+            cache = self.__messages()
+            if self.__shared:
+                cache = self.__cache = cache.copy()
+                self.__shared = False
+            cache.append(message)
+            self.notify('save', message)
 
     def sleep(self):
-        self.__awake = False
+        with self.__lock:
+            self.__flags &= ~self.AWAKE
+            self.notify('sleep')
 
     def wakeup(self):
-        self.__awake = True
+        with self.__lock:
+            self.__flags |= self.AWAKE
+            self.notify('wakeup')
 
     @property
     def chat_id(self):
         return self.__chat_id
 
+    @property
+    def flags(self):
+        return self.__flags
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def lsn(self):
+        return self.__lsn
+
+    @lsn.setter
+    def lsn(self, lsn: int):
+        self.__lsn = lsn
+
     @property
     def started(self):
-        return self.__started
+        return bool(self.__flags & self.STARTED)
 
     @property
     def awake(self):
-        return self.__awake
+        return bool(self.__flags & self.AWAKE)
+
+    @property
+    def messages(self):
+        """ Read-only view of the cached messages, without copying them.
+        """
+        return self.__messages().view()
 
     @property
     def cache(self):
-        return self.__cache.copy()
+        with self.__lock:
+            return list(self.__messages())
 
 class GameChat(Chat):
 
+    __slots__ = ('__game',)
+
     def __init__(self, chat_id: int):
+        ## Imported here: `telebot.game` imports the bot, which imports this module
+        from ..game import Game
+
         Chat.__init__(self, chat_id)
 
-        self.__game = Game()
\ No newline at end of file
+        self.__game = Game()
@@ -1 +1,4 @@
-from .data import Data
\ No newline at end of file
+from .data import Data
+from .storage import Storage, PickleStorage
+from .shard import ShardStorage
+from .sqlite import SQLiteStorage
\ No newline at end of file
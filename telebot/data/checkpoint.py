@@ -0,0 +1,46 @@
+## Standard Library
+import threading
+import traceback
+
+## Local
+from ..botlib import stderr, stdout
+
+class Checkpoint(threading.Thread):
+    """ Checkpoint(data: Data, interval: float=None)
+
+        Background thread calling `data.checkpoint()` every `interval`
+        seconds, or as soon as `wake()` is called. Checkpoints without
+        unsaved changes write nothing.
+    """
+
+    def __init__(self, data: object, interval: float=None):
+        threading.Thread.__init__(self, name='telebot-checkpoint', daemon=True)
+        self.data = data
+        self.interval = interval
+
+        self.__wake = threading.Event()
+        self.__stop = threading.Event()
+
+    def run(self):
+        while not self.__stop.is_set():
+            self.__wake.wait(self.interval)
+            self.__wake.clear()
+            if self.__stop.is_set():
+                continue
+            try:
+                self.data.checkpoint()
+                chats, written = self.data.last_written
+                if written:
+                    stdout[3] << f"> Checkpoint: {chats} chats, {written} bytes, paused {1000 * self.data.last_pause:.2f} ms"
+            except Exception as error:
+                for line in traceback.format_tb(error.__traceback__):
+                    stderr[1] << line
+                stderr[1] << f"> Checkpoint failed: {error}"
+
+    def wake(self):
+        self.__wake.set()
+
+    def stop(self):
+        self.__stop.set()
+        self.__wake.set()
+        self.join()
@@ -1,42 +1,420 @@
+## Standard Library
+import copy
+import heapq
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
 ## Local
-from ..botlib import pkload, pkdump
+from ..botlib import pkdump
 from ..chat import Chat
+from .journal import Journal
+from .checkpoint import Checkpoint
+from .storage import PickleStorage
+
+
+class Common(dict):
+    """ Dictionary that counts its own changes in `version`.
+        Changes inside stored values are not seen; call `touch()` after them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.version = 0
+
+    def touch(self):
+        self.version += 1
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self.touch()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.touch()
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self.touch()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.touch()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, *args):
+        self.touch()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self.touch()
+        return dict.popitem(self)
+
+    def clear(self):
+        dict.clear(self)
+        self.touch()
 
 
 class Data(object):
+    """ Data(storage: Storage=None, journal: bool=False, compact: int=1000, interval: float=None, dirty: int=None, budget: int=None)
+
+        Chats are kept by `storage`, a `PickleStorage` by default.
+
+        With `journal=True`, chat mutations are appended to
+        `<bot>.bot-journal.*` as they happen and the full snapshot
+        `<bot>.bot-data` is only rewritten every `compact` records.
+
+        With `interval` (seconds) or `dirty` (number of changes) set,
+        snapshots are written every `interval` seconds or `dirty` changes.
+        Either way, they are written by a background thread, started on
+        `load` and stopped on `close`, so that handlers never wait for them.
+
+        With a lazy storage (`ShardStorage`, `SQLiteStorage`), chats are
+        only read on first access. At most `budget` chats are kept in
+        memory, the least recently used ones are written back and dropped.
+        Only chats changed since they were last written are written again,
+        and `common` only if it changed.
+    """
 
     _EXT = 'bot-data'
+    _LOG = 'bot-journal'
 
     _MEMORY_DEFAULT = {
         'chats': {},
-        'common': {}
+        'common': {},
+        'lsn': 0,
     }
-    def __init__(self):
-        self._memory = self._MEMORY_DEFAULT.copy()
+    def __init__(self, storage: object=None, journal: bool=False, compact: int=1000, interval: float=None, dirty: int=None, budget: int=None):
+        self.storage = PickleStorage() if storage is None else storage
+
+        if budget is not None and not self.storage.lazy:
+            raise ValueError(f'Chat `budget` requires a lazy storage, not `{self.storage.__class__.__name__}`.')
+
+        self.journaled = journal
+        self.compact_every = compact
+        self.interval = interval
+        self.dirty_limit = dirty
+        self.budget = budget
+
+        self._memory = self._memory_default()
+
+        ## Changes since the last snapshot
+        self.changes = 0
+        ## Chats and bytes written by the last checkpoint, and bytes written overall
+        self.last_written = (0, 0)
+        self.total_written = 0
+        ## Seconds the last checkpoint held the lock, blocking chat changes, and the longest such pause
+        self.last_pause = 0.0
+        self.max_pause = 0.0
+
+        self._lock = threading.RLock()
+        self._dump_lock = threading.Lock()
+
+        self._journal = None
+        self._checkpoint = None
+        self._bot_name = None
+
+        ## Evicted chats still referenced elsewhere, and those evicted since the last snapshot
+        self._ghosts = weakref.WeakValueDictionary()
+        self._evicted = set()
+
+        ## Chats changed since last written, and `common.version` when last written
+        self._dirty = set()
+        self._common_version = None
 
     def __getitem__(self, key):
         return self._memory[key]
 
     def __setitem__(self, key, value):
+        if key == 'common' and not isinstance(value, Common):
+            value = Common(value)
         self._memory[key] = value
 
+    def _memory_default(self) -> dict:
+        memory = {key: copy.copy(value) for key, value in self._MEMORY_DEFAULT.items()}
+        memory['common'] = Common()
+        if self.storage.lazy:
+            memory['chats'] = OrderedDict()
+        return memory
+
     def get_chat(self, chat_id):
         try:
-            return self.chats[chat_id]
+            chat = self.chats[chat_id]
         except KeyError:
-            self.chats[chat_id] = Chat(chat_id)
-            return self.chats[chat_id]
+            with self._lock:
+                if chat_id not in self.chats:
+                    self.chats[chat_id] = self._fault(chat_id)
+                    self.chats[chat_id].listen(self._on_change, self._lock)
+                    self._evict()
+                return self.chats[chat_id]
+        else:
+            if self.storage.lazy:
+                with self._lock:
+                    try:
+                        self.chats.move_to_end(chat_id)
+                    except KeyError: ## evicted meanwhile, brought back on change
+                        pass
+            return chat
+
+    def _fault(self, chat_id: int) -> Chat:
+        if chat_id in self._ghosts:
+            return self._ghosts.pop(chat_id)
+        chat = self.storage.get(chat_id)
+        return Chat(chat_id) if chat is None else chat
+
+    def get_flags(self, chat_id: int) -> int:
+        """ Flags of a chat, as in `Chat.flags`, without loading it into
+            memory: lazy storages answer from their index.
+        """
+        with self._lock:
+            chat = self.chats.get(chat_id)
+            if chat is None:
+                chat = self._ghosts.get(chat_id)
+            if chat is not None:
+                return chat.flags
+            flags = self.storage.flags(chat_id) if self.storage.lazy else None
+            return Chat.AWAKE if flags is None else flags
+
+    def _evict(self):
+        ## Drops the least recently used chats over budget, writing back changed ones
+        if self.budget is None:
+            return
+        records = []
+        while len(self.chats) > self.budget:
+            chat_id, chat = self.chats.popitem(last=False)
+            self._ghosts[chat_id] = chat
+            if chat_id in self._dirty:
+                records.append((chat_id, self.storage.encode(chat)))
+                self._dirty.discard(chat_id)
+                self._evicted.add(chat_id)
+        if records:
+            self.total_written += self.storage.put(records)
+
+    def _on_change(self, chat: Chat, op: str, *args):
+        ## Called by chats while holding `self._lock`
+        self.changes += 1
+        self._dirty.add(chat.chat_id)
+        if self._journal is not None:
+            ## Chats written back carry it, so that replay skips what they hold
+            chat.lsn = self._journal.append(op, chat.chat_id, *args)
+
+        if self.storage.lazy and chat.chat_id not in self.chats:
+            ## Changed after being evicted: bring it back
+            self._ghosts.pop(chat.chat_id, None)
+            self.chats[chat.chat_id] = chat
+            self._evict()
+
+        ## Never written here, while holding `self._lock`
+        if self._checkpoint is not None:
+            if self.dirty_limit is not None and self.changes >= self.dirty_limit:
+                self._checkpoint.wake()
+            elif self._journal is not None and self._journal.count >= self.compact_every:
+                self._checkpoint.wake()
 
     def load(self, bot_name: str):
-        fname = f'{bot_name}.{self._EXT}'
-        self._memory.update(pkload(fname))
+        self._bot_name = bot_name
+        self.storage.open(bot_name)
+        ## A missing snapshot starts empty, and is still reported without a journal
+        missing = None
+        try:
+            self._memory.update(self.storage.load())
+        except FileNotFoundError as error:
+            if not (self.journaled or self.storage.lazy):
+                missing = error
+        finally:
+            self._memory['common'] = Common(self.common)
+            self._common_version = None
+
+        ## Only past a readable or missing snapshot, so that a corrupt one is never overwritten
+        if self.storage.lazy:
+            ## Chats from a plain snapshot are moved to the storage as they get written back
+            self._memory['chats'] = OrderedDict(self.chats)
+            self._dirty.update(self.chats)
+            self._evict()
+
+        for chat in self.chats.values():
+            chat.listen(self._on_change, self._lock)
+
+        if self.journaled:
+            self.replay()
+
+        if self._checkpoint is None and (self.journaled or self.interval is not None or self.dirty_limit is not None):
+            self._checkpoint = Checkpoint(self, self.interval)
+            self._checkpoint.start()
+
+        if missing is not None:
+            raise missing
+
+    def replay(self):
+        """ Applies journal records newer than the snapshot, and than the
+            chat they change, then starts a new journal segment.
+        """
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        journal = Journal(f'{self._bot_name}.{self._LOG}')
+        for lsn, op, chat_id, *args in journal.replay(self['lsn']):
+            if op in Chat.OPS:
+                ## Chats evicted since the snapshot were written back with later records
+                chat = self.get_chat(chat_id)
+                if lsn > chat.lsn:
+                    getattr(chat, op)(*args)
+                    chat.lsn = lsn
+        ## Segments covered by the snapshot may be gone: number new records after it
+        journal.lsn = max(journal.lsn, self['lsn'])
+        journal.rotate()
+        self._journal = journal
+
+    def snapshot(self, dirty: bool=False) -> dict:
+        """ Point-in-time copy of the memory, safe to serialize while
+            chats keep changing. With `dirty`, only chats and `common`
+            changed since last written are included.
+
+            Chats are copied on write (see `Chat`), so taking a snapshot
+            costs one small object per chat, whatever their cache sizes.
+        """
+        with self._lock:
+            memory = self._memory.copy()
+            if dirty:
+                memory['chats'] = {chat_id: copy.copy(self.chats[chat_id]) for chat_id in self._dirty if chat_id in self.chats}
+            else:
+                memory['chats'] = {chat_id: copy.copy(chat) for chat_id, chat in self.chats.items()}
+            if dirty and self.common.version == self._common_version:
+                del memory['common']
+            else:
+                memory['common'] = dict(self.common)
+        return memory
+
+    def checkpoint(self, blocking: bool=True) -> bool:
+        """ Writes a full snapshot and drops the journal segments it covers.
+            Only the in-memory copy is taken under the lock; serialization
+            happens outside of it. Returns `False` if another checkpoint
+            was running and `blocking` is not set. If writing fails, the
+            changes it took are left for the next checkpoint.
+
+            The time spent holding the lock, during which handlers changing
+            chats wait, is kept in `last_pause` and `max_pause`.
+        """
+        if not self._dump_lock.acquire(blocking):
+            return False
+        try:
+            with self._lock:
+                start = time.perf_counter()
+                if not (self._dirty or self.common.version != self._common_version or self.changes):
+                    self.last_written = (0, 0)
+                    return True
+                memory = self.snapshot(dirty=self.storage.lazy)
+                ## Kept until written, for the next checkpoint to retry
+                taken = (self.changes, self._dirty, self._evicted, self._common_version, self['lsn'])
+                self.changes = 0
+                self._dirty = set()
+                self._evicted = set()
+                self._common_version = self.common.version
+                if self._journal is not None:
+                    memory['lsn'] = self['lsn'] = self._journal.rotate()
+                self.last_pause = time.perf_counter() - start
+                self.max_pause = max(self.max_pause, self.last_pause)
+            chats = len(memory['chats'])
+            written = 0
+            try:
+                if self.storage.lazy:
+                    written += self._write_back(memory['chats'])
+                    memory['chats'] = {}
+                written += self.storage.dump(memory)
+            except BaseException:
+                self._retake(*taken)
+                raise
+            if self._journal is not None:
+                self._journal.prune()
+            self.last_written = (chats, written)
+            self.total_written += written
+            return True
+        finally:
+            self._dump_lock.release()
+
+    def _retake(self, changes: int, dirty: set, evicted: set, common_version: int, lsn: int):
+        ## Marks what a failed checkpoint took as still to be written
+        with self._lock:
+            self.changes += changes
+            self._dirty |= dirty
+            self._evicted |= evicted
+            self._common_version = common_version
+            self['lsn'] = lsn
+
+    def _write_back(self, chats: dict) -> int:
+        records = [(chat_id, self.storage.encode(chat)) for chat_id, chat in chats.items()]
+        with self._lock:
+            ## Chats evicted meanwhile were written back with a newer state
+            return self.storage.put([record for record in records if record[0] not in self._evicted])
 
     def save(self, bot_name: str):
-        fname = f'{bot_name}.{self._EXT}'
-        pkdump(fname, self._memory)
+        if self._bot_name is None:
+            self._bot_name = bot_name
+            self.storage.open(bot_name)
+        if bot_name == self._bot_name:
+            self.checkpoint()
+        else:
+            fname = f'{bot_name}.{self._EXT}'
+            pkdump(fname, self.snapshot())
+
+    def close(self):
+        if self._checkpoint is not None:
+            self._checkpoint.stop()
+            self._checkpoint = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self.storage.close()
 
     def clear(self):
-        self._memory.update(self._MEMORY_DEFAULT)
+        with self._lock:
+            self._memory.update(self._memory_default())
+            self._dirty.clear()
+            self._ghosts.clear()
+            self._evicted.clear()
+            self._common_version = None
+            self.storage.clear()
+
+    def iter_chats(self):
+        """ Yields every chat, those in memory first. With a lazy storage,
+            the others are read one at a time and not kept in memory.
+        """
+        with self._lock:
+            chats = list(self.chats.values())
+        yield from chats
+
+        if self.storage.lazy:
+            for chat_id in self.storage.keys():
+                if chat_id in self.chats:
+                    continue
+                chat = self._ghosts.get(chat_id)
+                yield self.storage.get(chat_id) if chat is None else chat
+
+    def iter_messages(self, merge: bool=False, types: set=None, since: object=None, until: object=None):
+        """ Yields cached messages of every chat, chat by chat, or merged
+            by `message.date` when `merge` is set. Only messages from chats
+            of the given `types` and dated within [since, until) are kept.
+        """
+        def select(chat: Chat):
+            ## A copy's messages are left alone by handlers saving new ones
+            with self._lock:
+                chat = copy.copy(chat)
+            for message in chat.messages:
+                if types is not None and getattr(getattr(message, 'chat', None), 'type', None) not in types:
+                    continue
+                if since is not None and message.date < since:
+                    continue
+                if until is not None and message.date >= until:
+                    ## Messages are cached in arrival order
+                    break
+                yield message
+
+        if merge:
+            yield from heapq.merge(*map(select, self.iter_chats()), key=(lambda message: message.date))
+        else:
+            for chat in self.iter_chats():
+                yield from select(chat)
 
     @property
     def chats(self):
@@ -44,4 +422,4 @@ class Data(object):
 
     @property
     def common(self):
-        return self._memory['common']
\ No newline at end of file
+        return self._memory['common']
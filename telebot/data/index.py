@@ -0,0 +1,149 @@
+## Standard Library
+import os
+import mmap
+import struct
+
+class Index(object):
+    """ Index(fname: str, capacity: int=1024)
+
+        Memory-mapped, open addressing hash table from chat_id to the
+        `(offset, length, flags)` of its latest record. Opening it only
+        maps the file, and lookups read the slots they probe.
+
+        The table is marked dirty while open and clean on `close`; a
+        table found dirty on `open` is reset, to be rebuilt by the caller.
+    """
+
+    ## magic, format, clean, bits, count, end, stale
+    HEADER = struct.Struct('<4sBBBxQQQ')
+    ## chat_id, offset (0 for empty slots), length, flags
+    SLOT = struct.Struct('<qQIB3x')
+
+    MAGIC = b'TIDX'
+    FORMAT = 1
+
+    ## Fibonacci hashing constant, 2^64 / golden ratio
+    GOLDEN = 0x9E3779B97F4A7C15
+    MASK = (1 << 64) - 1
+
+    def __init__(self, fname: str, capacity: int=1024):
+        self.fname = fname
+        self.bits = max(capacity - 1, 1).bit_length()
+
+        self.count = 0
+        self.end = 0
+        self.stale = 0
+
+        self.file = None
+        self.mm = None
+
+    def open(self) -> bool:
+        """ Maps the table, returning whether it can be trusted.
+        """
+        try:
+            self.file = open(self.fname, 'r+b')
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            magic, format, clean, bits, count, end, stale = self.HEADER.unpack_from(self.mm)
+        except (FileNotFoundError, ValueError, struct.error):
+            magic = None
+        if magic != self.MAGIC or format != self.FORMAT or not clean:
+            self.reset(self.bits)
+            return False
+
+        self.bits, self.count, self.end, self.stale = bits, count, end, stale
+        self._header(clean=False)
+        return True
+
+    def _create(self, fname: str, bits: int):
+        with open(fname, 'wb') as file:
+            file.write(self.HEADER.pack(self.MAGIC, self.FORMAT, False, bits, 0, 0, 0))
+            file.truncate(self.HEADER.size + self.SLOT.size * (1 << bits))
+
+    def _header(self, clean: bool):
+        self.HEADER.pack_into(self.mm, 0, self.MAGIC, self.FORMAT, clean, self.bits, self.count, self.end, self.stale)
+
+    def reset(self, bits: int):
+        """ Replaces the table by an empty one with `2 ** bits` slots.
+        """
+        self._unmap()
+        self._create(f'{self.fname}.tmp', bits)
+        os.replace(f'{self.fname}.tmp', self.fname)
+        self.file = open(self.fname, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        self.bits = bits
+        self.count = self.end = self.stale = 0
+
+    def _probe(self, chat_id: int):
+        ## Yields slot positions, starting from the hashed one
+        size = 1 << self.bits
+        slot = ((chat_id * self.GOLDEN) & self.MASK) >> (64 - self.bits)
+        for _ in range(size):
+            yield self.HEADER.size + self.SLOT.size * slot
+            slot = (slot + 1) & (size - 1)
+
+    def get(self, chat_id: int) -> tuple:
+        """ get(chat_id: int) -> (offset, length, flags) or None
+        """
+        for position in self._probe(chat_id):
+            key, offset, length, flags = self.SLOT.unpack_from(self.mm, position)
+            if not offset:
+                return None
+            if key == chat_id:
+                return (offset, length, flags)
+        return None
+
+    def set(self, chat_id: int, offset: int, length: int, flags: int) -> int:
+        """ Points `chat_id` to a new record, returning the length of the
+            one it replaces, if any.
+        """
+        if 2 * (self.count + 1) > (1 << self.bits):
+            self._grow()
+        for position in self._probe(chat_id):
+            key, old_offset, old_length, old_flags = self.SLOT.unpack_from(self.mm, position)
+            if not old_offset or key == chat_id:
+                self.SLOT.pack_into(self.mm, position, chat_id, offset, length, flags)
+                if not old_offset:
+                    self.count += 1
+                    return None
+                return old_length
+
+    def _grow(self):
+        items = list(self.items())
+        end, stale = self.end, self.stale
+        self.reset(self.bits + 1)
+        for chat_id, (offset, length, flags) in items:
+            self.set(chat_id, offset, length, flags)
+        self.end, self.stale = end, stale
+
+    def items(self):
+        for slot in range(1 << self.bits):
+            key, offset, length, flags = self.SLOT.unpack_from(self.mm, self.HEADER.size + self.SLOT.size * slot)
+            if offset:
+                yield (key, (offset, length, flags))
+
+    def keys(self):
+        return [chat_id for chat_id, _ in self.items()]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, chat_id: int) -> bool:
+        return self.get(chat_id) is not None
+
+    def flush(self):
+        self._header(clean=False)
+        self.mm.flush()
+
+    def close(self):
+        if self.mm is not None:
+            self._header(clean=True)
+            self.mm.flush()
+        self._unmap()
+
+    def _unmap(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
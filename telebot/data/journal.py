@@ -0,0 +1,88 @@
+## Standard Library
+import os
+import glob
+import pickle
+
+class Journal(object):
+    """ Journal(fname: str, sync: bool=False)
+
+        Append-only log of chat mutations. Records are pickled tuples
+        `(lsn, op, chat_id, *args)` written to numbered segments
+        `<fname>.<first-lsn>`, so that a snapshot can be taken while new
+        records keep going to a fresh segment.
+
+        Example:
+        >>> journal = Journal('bot.bot-journal')
+        >>> for lsn, op, chat_id, *args in journal.replay():
+        ...     ...
+        >>> journal.rotate()
+        >>> journal.append('start', chat_id)
+    """
+
+    def __init__(self, fname: str, sync: bool=False):
+        self.fname = fname
+        self.sync = sync
+
+        ## Last sequence number written or replayed
+        self.lsn = 0
+        ## Records appended since the last rotation
+        self.count = 0
+
+        self.file = None
+
+    def segments(self) -> list:
+        segments = glob.glob(f'{glob.escape(self.fname)}.*')
+        return sorted(segments, key=(lambda s: int(s.rsplit('.', 1)[1])))
+
+    def replay(self, lsn: int=0):
+        """ Yields every record with sequence number greater than `lsn`.
+            A torn record at the end of a segment (crash mid-write) ends it,
+            and is truncated, as records may be appended to that segment.
+            `self.lsn` only accounts for the records read: once segments
+            are pruned, raise it to the snapshot's before appending.
+        """
+        for segment in self.segments():
+            with open(segment, 'r+b') as file:
+                end = 0
+                while True:
+                    try:
+                        record = pickle.load(file)
+                    except Exception:
+                        ## End of segment, or torn bytes, which may fail to unpickle in many ways
+                        file.truncate(end)
+                        break
+                    end = file.tell()
+                    self.lsn = max(self.lsn, record[0])
+                    if record[0] > lsn:
+                        yield record
+
+    def append(self, op: str, chat_id: int, *args) -> int:
+        self.lsn += 1
+        pickle.dump((self.lsn, op, chat_id, *args), self.file, pickle.HIGHEST_PROTOCOL)
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.count += 1
+        return self.lsn
+
+    def rotate(self) -> int:
+        """ Closes the current segment and opens a new one.
+            Returns the sequence number of the last record before it.
+        """
+        if self.file is not None:
+            self.file.close()
+        self.file = open(f'{self.fname}.{self.lsn + 1}', 'ab')
+        self.count = 0
+        return self.lsn
+
+    def prune(self) -> None:
+        """ Removes every segment but the current one.
+        """
+        for segment in self.segments():
+            if segment != self.file.name:
+                os.remove(segment)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,222 @@
+## Standard Library
+import os
+import struct
+import threading
+
+## Local
+from ..botlib import pkload, pkdump
+from ..chat import Chat
+from .storage import Storage
+from .index import Index
+
+class Shard(object):
+    """ Shard(fname: str, flags: callable=None)
+
+        Single append-only file of serialized chats, with a memory-mapped
+        `Index` in `<fname>.index`. Rewriting a chat appends a new record
+        and supersedes the old one; stale records are compacted away once
+        they outweigh live ones.
+
+        `flags(blob) -> int` reads the chat flags stored in the index next
+        to each offset, `None` if unknown.
+
+        If the index was not closed cleanly, it is rebuilt on `open` by
+        scanning the file, and a torn record at its end is dropped.
+    """
+
+    ## chat_id, length
+    HEADER = struct.Struct('<qI')
+
+    ## Index flags hold the chat flags only when this bit is set
+    KNOWN = 0x80
+    ## Enough of a record to read its flags
+    PREFIX = 64
+
+    def __init__(self, fname: str, flags: callable=None):
+        self.fname = fname
+        self.flags_of = flags
+
+        self.index = Index(f'{fname}.index')
+
+        self.file = None
+        self.lock = threading.Lock()
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self):
+        with self.lock:
+            return self.index.keys()
+
+    def open(self):
+        self.file = open(self.fname, 'a+b')
+        if self.index.open():
+            self.recover(self.index.end)
+        else:
+            self.recover(0)
+
+    def recover(self, offset: int):
+        """ Indexes complete records past `offset` and truncates a torn tail.
+        """
+        size = self.file.seek(0, os.SEEK_END)
+        while offset + self.HEADER.size <= size:
+            self.file.seek(offset)
+            chat_id, length = self.HEADER.unpack(self.file.read(self.HEADER.size))
+            if offset + self.HEADER.size + length > size:
+                break
+            prefix = self.file.read(min(length, self.PREFIX))
+            self._index(chat_id, offset + self.HEADER.size, length, self._flags(prefix))
+            offset += self.HEADER.size + length
+        if offset < size:
+            self.file.truncate(offset)
+        self.index.end = offset
+
+    def _flags(self, blob: bytes) -> int:
+        flags = None if self.flags_of is None else self.flags_of(blob)
+        return 0 if flags is None else (flags | self.KNOWN)
+
+    def _index(self, chat_id: int, offset: int, length: int, flags: int):
+        old_length = self.index.set(chat_id, offset, length, flags)
+        if old_length is not None:
+            self.index.stale += self.HEADER.size + old_length
+
+    def get(self, chat_id: int) -> bytes:
+        with self.lock:
+            entry = self.index.get(chat_id)
+            if entry is None:
+                return None
+            offset, length, flags = entry
+            self.file.seek(offset)
+            return self.file.read(length)
+
+    def flags(self, chat_id: int) -> tuple:
+        """ flags(chat_id: int) -> (found: bool, flags: int)
+            `flags` is `None` if the chat is found but its flags are unknown.
+        """
+        with self.lock:
+            entry = self.index.get(chat_id)
+        if entry is None:
+            return (False, None)
+        flags = entry[2]
+        return (True, (flags & ~self.KNOWN) if (flags & self.KNOWN) else None)
+
+    def put(self, records: list) -> int:
+        """ put([(chat_id, blob), ...]) -> int
+            Appends the records, returning the number of bytes written.
+        """
+        written = 0
+        with self.lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            for chat_id, blob in records:
+                self.file.write(self.HEADER.pack(chat_id, len(blob)))
+                self.file.write(blob)
+                self._index(chat_id, offset + self.HEADER.size, len(blob), self._flags(blob))
+                offset += self.HEADER.size + len(blob)
+                written += self.HEADER.size + len(blob) + self.index.SLOT.size
+        return written
+
+    def flush(self) -> int:
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            end = self.file.seek(0, os.SEEK_END)
+            if self.index.stale > end - self.index.stale:
+                end = self._compact()
+            self.index.end = end
+            self.index.flush()
+            return self.index.HEADER.size
+
+    def _compact(self) -> int:
+        ## Copies live records to a new file, then swaps it in
+        items = []
+        with open(f'{self.fname}.tmp', 'wb') as file:
+            for chat_id, (offset, length, flags) in self.index.items():
+                self.file.seek(offset)
+                blob = self.file.read(length)
+                file.write(self.HEADER.pack(chat_id, length))
+                items.append((chat_id, file.tell(), length, flags))
+                file.write(blob)
+            end = file.tell()
+            file.flush()
+            os.fsync(file.fileno())
+        self.file.close()
+        os.replace(f'{self.fname}.tmp', self.fname)
+        self.file = open(self.fname, 'a+b')
+        self.index.reset(self.index.bits)
+        for item in items:
+            self.index.set(*item)
+        return end
+
+    def clear(self):
+        with self.lock:
+            self.file.truncate(0)
+            self.index.reset(self.index.bits)
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+            self.index.close()
+
+class ShardStorage(Storage):
+    """ Chats in a `Shard` at `<bot>.bot-shard`, everything else pickled
+        to `<bot>.bot-data`. Opening it maps the chat index without reading
+        it, and `flags` answers from the index without decoding chats. A plain `PickleStorage` snapshot is picked up
+        as is, and its chats move to the shard as they are written back.
+    """
+
+    _EXT = 'bot-data'
+    _SHARD = 'bot-shard'
+
+    lazy = True
+
+    def __init__(self):
+        self.fname = None
+        self.shard = None
+
+        ## Last persisted `common` and `lsn`
+        self.meta = {}
+
+    def open(self, bot_name: str) -> None:
+        self.fname = f'{bot_name}.{self._EXT}'
+        self.shard = Shard(f'{bot_name}.{self._SHARD}', flags=Chat.decode_flags)
+        self.shard.open()
+
+    def load(self) -> dict:
+        self.meta = pkload(self.fname)
+        return self.meta
+
+    def get(self, chat_id: int) -> Chat:
+        blob = self.shard.get(chat_id)
+        return None if blob is None else self.decode(blob)
+
+    def flags(self, chat_id: int) -> int:
+        found, flags = self.shard.flags(chat_id)
+        if found and flags is None:
+            return Storage.flags(self, chat_id)
+        return flags
+
+    def keys(self) -> list:
+        return self.shard.keys()
+
+    def put(self, records: list) -> int:
+        return self.shard.put(records)
+
+    def dump(self, memory: dict) -> int:
+        written = self.shard.flush()
+        self.meta = {**self.meta, **memory, 'chats': {}}
+        pkdump(self.fname, self.meta)
+        return written + os.path.getsize(self.fname)
+
+    def clear(self) -> None:
+        if self.shard is not None:
+            self.shard.clear()
+
+    def close(self) -> None:
+        if self.shard is not None:
+            self.shard.close()
+            self.shard = None
@@ -0,0 +1,116 @@
+## Standard Library
+import pickle
+import sqlite3
+import threading
+
+## Local
+from ..botlib import pkload
+from ..chat import Chat
+from .storage import Storage
+
+class SQLiteStorage(Storage):
+    """ SQLiteStorage(batch: int=256)
+
+        One row per chat in `<bot>.bot-db`, opened in WAL mode. Chats
+        written back by `put` are buffered and committed `batch` at a time,
+        or on `dump` together with `common` and `lsn`, when given.
+
+        If the database is empty, a `<bot>.bot-data` snapshot left by
+        `PickleStorage` is loaded instead and moved over on the next `dump`.
+    """
+
+    _EXT = 'bot-db'
+    _PICKLE_EXT = 'bot-data'
+
+    _SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS chats (chat_id INTEGER PRIMARY KEY, data BLOB NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB NOT NULL)',
+    )
+
+    lazy = True
+
+    def __init__(self, batch: int=256):
+        self.batch = batch
+
+        self.bot_name = None
+        self.conn = None
+        self.lock = threading.Lock()
+
+        ## chat_id -> blob, not yet committed
+        self.pending = {}
+
+    def open(self, bot_name: str) -> None:
+        self.bot_name = bot_name
+        ## Transactions are managed explicitly, see `_commit`
+        self.conn = sqlite3.connect(f'{bot_name}.{self._EXT}', isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self._SCHEMA:
+            self.conn.execute(statement)
+
+    def load(self) -> dict:
+        with self.lock:
+            meta = dict(self.conn.execute('SELECT key, value FROM meta'))
+        if not meta:
+            return pkload(f'{self.bot_name}.{self._PICKLE_EXT}')
+        return {key: pickle.loads(value) for key, value in meta.items()}
+
+    def get(self, chat_id: int) -> Chat:
+        with self.lock:
+            if chat_id in self.pending:
+                blob = self.pending[chat_id]
+            else:
+                row = self.conn.execute('SELECT data FROM chats WHERE chat_id = ?', (chat_id,)).fetchone()
+                blob = None if row is None else row[0]
+        return None if blob is None else self.decode(blob)
+
+    def keys(self) -> list:
+        with self.lock:
+            keys = {chat_id for chat_id, in self.conn.execute('SELECT chat_id FROM chats')}
+            return list(keys.union(self.pending))
+
+    def put(self, records: list) -> int:
+        with self.lock:
+            self.pending.update(records)
+            if len(self.pending) >= self.batch:
+                return self._commit()
+            return 0
+
+    def dump(self, memory: dict) -> int:
+        meta = [(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) for key, value in memory.items() if key != 'chats']
+        with self.lock:
+            self.pending.update((chat_id, self.encode(chat)) for chat_id, chat in memory.get('chats', {}).items())
+            return self._commit(meta)
+
+    def _commit(self, meta: list=()) -> int:
+        ## Called while holding `self.lock`
+        written = sum(len(blob) for blob in self.pending.values()) + sum(len(value) for key, value in meta)
+        self.conn.execute('BEGIN')
+        try:
+            self.conn.executemany('INSERT OR REPLACE INTO chats (chat_id, data) VALUES (?, ?)', self.pending.items())
+            self.conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', meta)
+        except:
+            self.conn.execute('ROLLBACK')
+            raise
+        else:
+            self.conn.execute('COMMIT')
+            self.pending.clear()
+            return written
+
+    def clear(self) -> None:
+        with self.lock:
+            self.pending.clear()
+            if self.conn is None:
+                return
+            self.conn.execute('BEGIN')
+            self.conn.execute('DELETE FROM chats')
+            self.conn.execute('DELETE FROM meta')
+            self.conn.execute('COMMIT')
+
+    def close(self) -> None:
+        if self.conn is not None:
+            with self.lock:
+                if self.pending:
+                    self._commit()
+                self.conn.close()
+                self.conn = None
@@ -0,0 +1,88 @@
+## Standard Library
+import os
+
+## Local
+from ..botlib import pkload, pkdump
+from ..chat import Chat
+
+class Storage(object):
+    """ Storage backend interface for `Data`.
+
+        Eager backends (`lazy = False`) return every chat from `load` and
+        rewrite them all on `dump`. Lazy backends return only `common` and
+        `lsn` from `load`, serve chats one at a time through `get` and
+        receive changed chats through `put`; the memory given to their
+        `dump` has no chats, and no `common` if it did not change.
+
+        Writing methods return the number of bytes written.
+
+        Example:
+        >>> class MyBot(TeleBot):
+        ...     __data__ = Data(storage=SQLiteStorage(), budget=10_000)
+    """
+
+    lazy = False
+
+    def open(self, bot_name: str) -> None:
+        raise NotImplementedError
+
+    def load(self) -> dict:
+        """ Returns the stored memory, raising `FileNotFoundError` if there is none.
+        """
+        raise NotImplementedError
+
+    def get(self, chat_id: int) -> Chat:
+        return None
+
+    def keys(self) -> list:
+        return []
+
+    def flags(self, chat_id: int) -> int:
+        """ Flags of a stored chat, `None` if there is none.
+        """
+        chat = self.get(chat_id)
+        return None if chat is None else chat.flags
+
+    def put(self, records: list) -> int:
+        """ put([(chat_id, blob), ...]) -> int
+            Writes chats encoded with `encode`. Called while `Data` holds its lock.
+        """
+        raise NotImplementedError
+
+    def dump(self, memory: dict) -> int:
+        """ Makes `memory` and every previous `put` durable.
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def encode(chat: Chat) -> bytes:
+        return chat.encode()
+
+    @staticmethod
+    def decode(blob: bytes) -> Chat:
+        return Chat.decode(blob)
+
+class PickleStorage(Storage):
+    """ The whole memory pickled to `<bot>.bot-data`.
+    """
+
+    _EXT = 'bot-data'
+
+    def __init__(self):
+        self.fname = None
+
+    def open(self, bot_name: str) -> None:
+        self.fname = f'{bot_name}.{self._EXT}'
+
+    def load(self) -> dict:
+        return pkload(self.fname)
+
+    def dump(self, memory: dict) -> int:
+        pkdump(self.fname, memory)
+        return os.path.getsize(self.fname)
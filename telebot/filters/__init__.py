@@ -1 +1,2 @@
-from .filters import *
\ No newline at end of file
+from .filters import *
+from .compiler import FilterCompiler, CompiledFilter
\ No newline at end of file
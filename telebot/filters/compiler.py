@@ -0,0 +1,153 @@
+## Standard Library
+import time
+
+## Third-Party
+from telegram.ext import BaseFilter
+from telegram.ext.filters import MergedFilter
+
+class FilterStats(object):
+    """ Counters of a single filter, over every handler using it.
+    """
+
+    __slots__ = ('filter', 'calls', 'rejections', 'time', 'shared')
+
+    def __init__(self, filter: BaseFilter):
+        self.filter = filter
+        ## Evaluations, those returning false and the seconds they took
+        self.calls = 0
+        self.rejections = 0
+        self.time = 0.0
+        ## Results reused from another handler, for the same update
+        self.shared = 0
+
+    @property
+    def rejection_rate(self) -> float:
+        return (self.rejections / self.calls) if self.calls else 0.0
+
+    @property
+    def cost(self) -> float:
+        return (self.time / self.calls) if self.calls else 0.0
+
+    @property
+    def score(self) -> float:
+        ## Expected cost of evaluating it per update rejected, lower goes first
+        if not self.calls:
+            return 0.0
+        return self.cost / max(self.rejection_rate, 1e-6)
+
+    def as_dict(self) -> dict:
+        return {
+            'filter': str(self.filter),
+            'calls': self.calls,
+            'rejections': self.rejections,
+            'rejection_rate': self.rejection_rate,
+            'time_avg': self.cost,
+            'time_total': self.time,
+            'shared': self.shared,
+        }
+
+class CompiledFilter(BaseFilter):
+    """ Conjunction of filters made by `FilterCompiler.compile`. Every
+        `reorder` evaluations, its filters are sorted so that the cheapest
+        and most often rejecting ones run first.
+    """
+
+    update_filter = True
+
+    def __init__(self, compiler: 'FilterCompiler', filters: list, reorder: int):
+        self.compiler = compiler
+        self.filters = filters
+        self.reorder = reorder
+        self.data_filter = any(filter.data_filter for filter in filters)
+        self.name = ' & '.join(str(filter) for filter in filters) or 'All'
+
+        self.__calls = 0
+
+    def filter(self, update: object) -> object:
+        self.__calls += 1
+        if self.reorder and not (self.__calls % self.reorder):
+            self.sort()
+
+        results = self.compiler.results(update)
+        data = {}
+        for filter in self.filters:
+            result = self.compiler.evaluate(filter, update, results)
+            if not result:
+                return False
+            if self.data_filter and isinstance(result, dict):
+                for key, value in result.items():
+                    data[key] = data.get(key, []) + (value if isinstance(value, list) else [value])
+        return data if data else True
+
+    def sort(self):
+        self.filters = sorted(self.filters, key=lambda filter: self.compiler.stats[id(filter)].score)
+
+    def __repr__(self):
+        return self.name
+
+class FilterCompiler(object):
+    """ FilterCompiler(reorder: int=256)
+
+        Compiles the filters of message handlers into `CompiledFilter`s,
+        flattening `&` combinations into a single conjunction. Filters are
+        evaluated at most once per update, the same instance being shared
+        by every handler, and timed.
+
+        Filters are assumed free of side effects: their order in a
+        conjunction changes as their cost and rejection rate are measured.
+        Use `reorder=0` to keep declaration order.
+    """
+
+    ## Attribute holding filter results on an update
+    _ATTR = '_telebot_filters'
+
+    def __init__(self, reorder: int=256):
+        self.reorder = reorder
+        ## id(filter) -> FilterStats
+        self.stats = {}
+
+    def compile(self, filters: tuple) -> CompiledFilter:
+        conjuncts = []
+        for filter in filters:
+            self.flatten(filter, conjuncts)
+        for filter in conjuncts:
+            if id(filter) not in self.stats:
+                self.stats[id(filter)] = FilterStats(filter)
+        return CompiledFilter(self, conjuncts, self.reorder)
+
+    @classmethod
+    def flatten(cls, filter: BaseFilter, conjuncts: list):
+        if isinstance(filter, MergedFilter) and filter.and_filter is not None and not isinstance(filter.and_filter, bool):
+            cls.flatten(filter.base_filter, conjuncts)
+            cls.flatten(filter.and_filter, conjuncts)
+        elif filter not in conjuncts:
+            conjuncts.append(filter)
+
+    def results(self, update: object) -> dict:
+        results = getattr(update, self._ATTR, None)
+        if results is None:
+            results = {}
+            setattr(update, self._ATTR, results)
+        return results
+
+    def evaluate(self, filter: BaseFilter, update: object, results: dict) -> object:
+        key = id(filter)
+        stats = self.stats[key]
+        if key in results:
+            stats.shared += 1
+            return results[key]
+        start = time.perf_counter()
+        result = results[key] = filter(update)
+        stats.time += time.perf_counter() - start
+        stats.calls += 1
+        if not result:
+            stats.rejections += 1
+        return result
+
+    def report(self) -> list:
+        """ Per filter: `calls`, `rejections` and `rejection_rate`, `time_avg`
+            and `time_total` in seconds and results `shared` across handlers,
+            most expensive first.
+        """
+        stats = sorted(self.stats.values(), key=lambda stats: stats.time, reverse=True)
+        return [stats.as_dict() for stats in stats]
@@ -1,17 +1,104 @@
 from telegram import Message, MessageEntity
 from telegram.ext import BaseFilter
 
-class Mention(BaseFilter):
-
-    def __init__(self, username):
-        self.username = username
-
-    def filter(self, message: Message):
-        for entity in message.entities:
-            if entity['type'] == 'mention':
-                i = entity['offset']
-                j = entity['length']
-                if message.text[i:i+j] == f'@{self.username}':
-                    return True
-        else:
-            return False
\ No newline at end of file
+class Keywords(BaseFilter):
+    """ Keywords(words: list=(), mentions: list=(), ignore_case: bool=True, whole: bool=False)
+
+        Matches messages containing any of `words` or mentioning any of the
+        `mentions` usernames, in text or caption. All of them are compiled
+        into a single Aho-Corasick automaton, so that matching takes time
+        linear in the message length, whatever the number of keywords.
+
+        With `whole`, words only match between non-word characters; mentions
+        always do. As a data filter, the keywords found are given to the
+        handler in `context.keywords`, or `info['keywords']`, in the order
+        found, mentions with their `@`.
+
+        Example:
+        >>> @TeleBot.message(Keywords(['moon', '🌝'], mentions=['ovilabot']))
+        ... def moon(self, info):
+        ...     print(info['keywords'])
+    """
+
+    data_filter = True
+
+    def __init__(self, words: list=(), mentions: list=(), ignore_case: bool=True, whole: bool=False):
+        self.ignore_case = ignore_case
+        self.name = f'{self.__class__.__name__}({len(words)} words, {len(mentions)} mentions)'
+
+        ## Trie: transitions, failure links and (keyword, whole, length) outputs of each state
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+
+        for word in words:
+            self.add(word, whole)
+        for username in mentions:
+            self.add(f"@{username.lstrip('@')}", True)
+        self.build()
+
+    def add(self, keyword: str, whole: bool):
+        ## Lowering may change the length, as with 'İ': the length matched is kept
+        key = keyword.lower() if self.ignore_case else keyword
+        state = 0
+        for char in key:
+            if char not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+                self.goto[state][char] = len(self.goto) - 1
+            state = self.goto[state][char]
+        self.out[state] += ((keyword, whole, len(key)),)
+
+    def build(self):
+        ## Breadth-first, so that failure links point to states already done
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.out[next_state] += self.out[self.fail[next_state]]
+                queue.append(next_state)
+
+    @staticmethod
+    def is_word(char: str) -> bool:
+        return char.isalnum() or char == '_'
+
+    def search(self, text: str) -> list:
+        """ Keywords found in `text`, each once, in the order found.
+        """
+        found = []
+        seen = set()
+        goto, fail, out = self.goto, self.fail, self.out
+        key = text.lower() if self.ignore_case else text
+        state = 0
+        for end, char in enumerate(key):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, whole, length in out[state]:
+                if keyword in seen:
+                    continue
+                if whole:
+                    start = end - length + 1
+                    if (start > 0 and self.is_word(key[start - 1])) or (end + 1 < len(key) and self.is_word(key[end + 1])):
+                        continue
+                seen.add(keyword)
+                found.append(keyword)
+        return found
+
+    def filter(self, message: Message) -> object:
+        found = self.search(message.text or message.caption or '')
+        return {'keywords': found} if found else False
+
+class Mention(Keywords):
+    """ Mention(*usernames: str)
+
+        Matches messages mentioning any of `usernames`, see `Keywords`.
+    """
+
+    def __init__(self, *usernames: str):
+        Keywords.__init__(self, mentions=usernames)
+        self.username = usernames[0] if len(usernames) == 1 else usernames
@@ -1,2 +1,2 @@
 from .game import Game, Player, GameError
-from .gamebot import GameBot
\ No newline at end of file
+from .gamebot import GameBot, AsyncGameBot
\ No newline at end of file
@@ -1,4 +1,5 @@
 from ..bot import TeleBot
+from ..aio import AsyncTeleBot
 from ..botlib import stdout
 from .game import Game, GameError
 
@@ -7,7 +8,7 @@ class GameBot(TeleBot):
     __game__ = Game
 
     def __init__(self, token: str, **options):
-        TeleBot.__init__(self, token, **options)
+        super().__init__(token, **options)
         self.games = {} ## chat_id: int -> game: Game
         self.queue = {} ## user_id: int -> chat_id: int
 
@@ -29,4 +30,8 @@ class GameBot(TeleBot):
 
     def in_game(self, info: dict):
         return self.in_group(info) and (info['chat_id'] in self.games) and (info['user_id'] in self.games[info['chat_id']])
-        
+
+class AsyncGameBot(GameBot, AsyncTeleBot):
+    """ `GameBot` running on asyncio, see `AsyncTeleBot`. Games calling
+        the bot's `client` await its calls, files sent included.
+    """
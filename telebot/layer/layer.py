@@ -23,6 +23,21 @@ class Layer:
     def layer(cls, func: staticmethod):
         return cls(func)
 
+    @classmethod
+    def args(cls, func: callable):
+        """ func(bot: Bot, *args) -> tuple
+            Layer that only replaces the arguments passed on by `func(bot, *args)`.
+            Bot classes fuse such layers into the handler, see `Pipeline`.
+        """
+        def decor(callback: callable):
+            @wraps(callback)
+            def new_callback(self, *args, **kwargs):
+                return callback(self, *func(self, *args), **kwargs)
+            return new_callback
+        decor.prepare = func
+        decor.__qualname__ = func.__qualname__
+        return cls(decor)
+
     @classmethod
     def apply(cls, callback: callable):
         return cls.stack(callback, callback.layer)
@@ -50,13 +65,9 @@ class Layer:
 ## Common layers
 
 ## with_info
-@Layer.layer
-def with_info(callback: callable):
-    @wraps(callback)
-    def new_callback(self, *args, **kwargs):
-        info = self.get_info(*args)
-        return callback(self, info, **kwargs)
-    return new_callback
+@Layer.args
+def with_info(bot: object, *args):
+    return (bot.get_info(*args),)
 
 ## log
 @Layer.layer
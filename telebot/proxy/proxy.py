@@ -1,9 +1,73 @@
+import time
+import threading
 from functools import wraps
+from inspect import isawaitable
+from collections import OrderedDict
 from telebot.botlib import stdout
+from telebot.chat import Chat
+
+class ProxyStats:
+    """ Counters of a proxy: results reused within an update (`hits`)
+        or from its TTL cache (`ttl_hits`), and evaluations (`misses`).
+        Over all of them, `calls` made, `rejections` and `time` spent,
+        from which handlers order their proxies.
+    """
+
+    __slots__ = ('name', 'hits', 'ttl_hits', 'misses', 'calls', 'rejections', 'time')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.ttl_hits = 0
+        self.misses = 0
+        self.calls = 0
+        self.rejections = 0
+        self.time = 0.0
+
+    def count(self, result: object, elapsed: float=0.0):
+        self.calls += 1
+        self.time += elapsed
+        if not result:
+            self.rejections += 1
+
+    @property
+    def rejection_rate(self) -> float:
+        return (self.rejections / self.calls) if self.calls else 0.0
+
+    @property
+    def cost(self) -> float:
+        return (self.time / self.calls) if self.calls else 0.0
+
+    @property
+    def score(self) -> float:
+        ## Expected cost per update rejected, lower goes first
+        if not self.calls:
+            return 0.0
+        return self.cost / max(self.rejection_rate, 1e-6)
+
+    def as_dict(self) -> dict:
+        return {
+            'proxy': self.name,
+            'hits': self.hits,
+            'ttl_hits': self.ttl_hits,
+            'misses': self.misses,
+            'calls': self.calls,
+            'rejection_rate': self.rejection_rate,
+            'time_avg': self.cost,
+        }
 
 class Proxy:
     """ func(bot: Bot, info: dict) -> bool
 
+        A proxy is evaluated at most once per update, its result reused by
+        every handler checking it. With `ttl` (seconds), results are also
+        kept across updates, by `key(info)`, by default the chat and user:
+
+        @Proxy.proxy('admin', ttl=60.0)
+        def admin(bot, info):
+            member = info['bot'].get_chat_member(info['chat_id'], info['user_id'])
+            return member.status in {'creator', 'administrator'}
+
         Example:
 
         @Proxy.proxy('reply')
@@ -21,10 +85,13 @@ class Proxy:
 
     NULL_FUNC = (lambda *args, **kwargs: None)
 
+    ## Results kept for `ttl`, at most, the least recently used dropped first
+    TTL_SIZE = 4096
+
     @classmethod
-    def proxy(cls, name: str):
+    def proxy(cls, name: str, ttl: float=None, key: callable=None):
         def decor(func: staticmethod):
-            return cls(func, name)
+            return cls(func, name, ttl=ttl, key=key)
         return decor
 
     @classmethod
@@ -42,23 +109,108 @@ class Proxy:
     def allow(cls, bot: object, info: dict,  proxy: dict):
         return all(proxy[key](bot, info) for key in proxy)
 
-    def __init__(self, func: callable, name: str):
+    def __init__(self, func: callable, name: str, ttl: float=None, key: callable=None, memo: bool=True):
         """ func(bot, info) -> None
+            key(info) -> hashable, for `ttl`
         """
-        self.func = func
         self.name = name
+        self.ttl = ttl
+        self.key = (lambda info: (info['chat_id'], info['user_id'])) if key is None else key
+        self.stats = ProxyStats(name)
+
+        ## Least recently used first, shared by worker threads
+        self.__ttl_cache = OrderedDict()
+        self.__ttl_lock = threading.Lock()
+
+        self.func = self.memo(func) if memo else func
+
+    def memo(self, func: callable) -> callable:
+        ## Results are kept in the update's `Info`, by name and function
+        memo_key = ('proxy', self.name, func)
+        stats = self.stats
+
+        @wraps(func)
+        def new_func(bot, info):
+            cache = getattr(info, 'cache', None)
+            if cache is not None and memo_key in cache:
+                stats.hits += 1
+                stats.count(cache[memo_key])
+                return cache[memo_key]
+            if self.ttl is not None:
+                entry = self.__ttl_get(self.key(info))
+                if entry is not None and entry[0] > time.monotonic():
+                    stats.ttl_hits += 1
+                    stats.count(entry[1])
+                    if cache is not None:
+                        cache[memo_key] = entry[1]
+                    return entry[1]
+            stats.misses += 1
+            start = time.perf_counter()
+            result = func(bot, info)
+            if isawaitable(result):
+                return self.__store_async(result, info, cache, memo_key, start)
+            self.__store(result, info, cache, memo_key, start)
+            return result
+        new_func.stats = stats
+        new_func.clear = self.clear
+        return new_func
+
+    def __ttl_get(self, ttl_key: object) -> tuple:
+        with self.__ttl_lock:
+            try:
+                self.__ttl_cache.move_to_end(ttl_key)
+            except KeyError:
+                return None
+            return self.__ttl_cache[ttl_key]
+
+    def __store(self, result: object, info: dict, cache: dict, memo_key: tuple, start: float):
+        self.stats.count(result, time.perf_counter() - start)
+        if cache is not None:
+            cache[memo_key] = result
+        if self.ttl is not None:
+            ttl_key = self.key(info)
+            with self.__ttl_lock:
+                self.__ttl_cache[ttl_key] = (time.monotonic() + self.ttl, result)
+                self.__ttl_cache.move_to_end(ttl_key)
+                while len(self.__ttl_cache) > self.TTL_SIZE:
+                    self.__ttl_cache.popitem(last=False)
+
+    async def __store_async(self, result: object, info: dict, cache: dict, memo_key: tuple, start: float):
+        result = await result
+        self.__store(result, info, cache, memo_key, start)
+        return result
+
+    def clear(self):
+        """ Forgets results kept for `ttl`.
+        """
+        with self.__ttl_lock:
+            self.__ttl_cache.clear()
 
     def __invert__(self):
+        stats = ProxyStats(f'~{self.name}')
+
         @wraps(self.func)
         def new_func(bot, info):
-            return (not self.func(bot, info))
-        return self.__class__(new_func, self.name)
+            start = time.perf_counter()
+            result = self.func(bot, info)
+            if isawaitable(result):
+                return self.__invert_async(result, stats, start)
+            stats.count(not result, time.perf_counter() - start)
+            return (not result)
+        new_func.stats = stats
+        return self.__class__(new_func, self.name, memo=False)
+
+    @staticmethod
+    async def __invert_async(result: object, stats: ProxyStats, start: float):
+        result = not await result
+        stats.count(result, time.perf_counter() - start)
+        return result
 
     def __neg__(self):
         @wraps(self.func)
         def new_func(bot, info):
             return True
-        return self.__class__(new_func, self.name)
+        return self.__class__(new_func, self.name, memo=False)
 
     @property
     def invert(self):
@@ -81,14 +233,12 @@ class Proxy:
 ## lock_start
 @Proxy.proxy('start')
 def lock_start(bot: object, info: dict):
-    chat = bot.get_chat(info['chat_id'])
-    return chat.started
+    return bool(bot.get_flags(info['chat_id']) & Chat.STARTED)
 
 ## lock_awake
 @Proxy.proxy('sleep')
 def lock_awake(bot: object, info: dict):
-    chat = bot.get_chat(info['chat_id'])
-    return chat.awake
+    return bool(bot.get_flags(info['chat_id']) & Chat.AWAKE)
 
 ## lock_group
 @Proxy.proxy('group')
@@ -0,0 +1,55 @@
+import asyncio
+
+from telebot.aio import AsyncTeleBot, Client
+from telebot.bench import FakeServer, LoadGenerator
+from telebot.bench.replay import StubClient
+
+
+class ShortcutBot(AsyncTeleBot):
+
+    @AsyncTeleBot.command('start')
+    async def start(self, update, context):
+        await update.message.reply_text('Hello', quote=True)
+
+    @AsyncTeleBot.query('menu')
+    async def menu(self, update, context, data):
+        await update.callback_query.answer('Done')
+
+
+def test_shortcuts():
+    calls = []
+    server = FakeServer(username='tbot')
+    server.listeners.append(lambda method, params, now: calls.append((method, params)))
+    bot = ShortcutBot('123:abc')
+    bot.client = StubClient(server)
+    bot.me = {'username': 'tbot'}
+
+    generator = LoadGenerator(username='tbot')
+    asyncio.run(bot.process({'update_id': 1, 'message': generator.command(7, 'start')}))
+    asyncio.run(bot.process({'update_id': 2, 'callback_query': generator.query(7, 'menu:1')}))
+    assert calls == [
+        ('sendMessage', {'chat_id': 7, 'text': 'Hello', 'reply_to_message_id': 1}),
+        ('answerCallbackQuery', {'callback_query_id': '1', 'text': 'Done'}),
+    ]
+
+
+def test_upload(tmp_path):
+    path = tmp_path / 'start.gif'
+    path.write_bytes(b'GIF89a')
+    calls = []
+
+    async def upload(url):
+        client = Client('123:abc', url=url)
+        await client.open()
+        try:
+            with open(path, 'rb') as file:
+                return await client.send_animation(chat_id=7, animation=file, caption='Go')
+        finally:
+            await client.close()
+
+    with FakeServer() as server:
+        server.listeners.append(lambda method, params, now: calls.append((method, params)))
+        message = asyncio.run(upload(server.url))
+    ## Files are sent as a multipart form, which the server reads without them
+    assert calls == [('sendAnimation', {'chat_id': '7', 'caption': 'Go'})]
+    assert message['caption'] == 'Go'
@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from telebot.data import Data, SQLiteStorage
+
+
+def test_load_corrupt(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'b.bot-data').write_bytes(b'not a pickle')
+
+    data = Data(interval=0.2)
+    with pytest.raises(Exception):
+        data.load('b')
+
+    ## Nothing may write over the snapshot left to look into
+    assert data._checkpoint is None
+    assert not any(thread.name == 'telebot-checkpoint' for thread in threading.enumerate())
+    assert (tmp_path / 'b.bot-data').read_bytes() == b'not a pickle'
+
+
+def test_load_missing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(interval=60)
+    with pytest.raises(FileNotFoundError):
+        data.load('b')
+    ## A new bot still gets its checkpoints
+    assert data._checkpoint is not None
+    data.close()
+
+
+def test_set_common(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data()
+    data['common'] = {'a': 1}
+    data.save('b')
+
+    data = Data()
+    data.load('b')
+    assert data.common == {'a': 1}
+
+
+def test_clear_evicted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(storage=SQLiteStorage(), budget=1)
+    data.load('b')
+    chats = [data.get_chat(chat_id) for chat_id in range(3)]
+    for chat in chats:
+        chat.start()
+    data.clear()
+
+    ## Evicted chats still referenced must not come back
+    assert not data.get_chat(0).started
+    assert not data._evicted
+    data.close()
+
+
+def test_iter_messages_saving():
+    data = Data()
+    chat = data.get_chat(1)
+    for index in range(10):
+        chat.save(index)
+
+    ## Handlers may keep saving messages while they are read
+    messages = []
+    for message in data.iter_messages():
+        chat.save(100 + message)
+        messages.append(message)
+    assert messages == list(range(10))
+    assert len(chat.cache) == 20
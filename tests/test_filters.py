@@ -0,0 +1,31 @@
+from telebot.filters import Keywords, Mention
+
+
+def test_keywords_order():
+    keywords = Keywords(['moon', 'sun', 'oon'])
+    assert keywords.search('The Sun and the MOON, the moon') == ['sun', 'moon', 'oon']
+
+
+def test_keywords_case():
+    assert Keywords(['Moon'], ignore_case=False).search('moon Moon') == ['Moon']
+    assert Keywords(['Moon']).search('MOON') == ['Moon']
+
+
+def test_keywords_whole():
+    keywords = Keywords(['moon'], whole=True)
+    assert keywords.search('honeymoon') == []
+    assert keywords.search('moons') == []
+    assert keywords.search('full moon!') == ['moon']
+
+
+def test_keywords_lower_length():
+    ## 'İ' lowers to two characters
+    keywords = Keywords(['İstanbul', 'ist'], whole=True)
+    assert keywords.search('İstanbul') == ['İstanbul']
+    assert keywords.search('İİ ist') == ['ist']
+
+
+def test_mention():
+    mention = Mention('ovilabot')
+    assert mention.search('hi @OvilaBot') == ['@ovilabot']
+    assert mention.search('hi @ovilabot_ and @ovilabots') == []
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from telebot.data import Data, ShardStorage, SQLiteStorage
+
+
+def crash(data: Data):
+    ## Drops the data without saving, as a crash would, closing files only
+    if data._checkpoint is not None:
+        data._checkpoint.stop()
+        data._checkpoint = None
+    if data._journal is not None:
+        data._journal.close()
+
+
+def test_replay_after_crash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(journal=True)
+    data.load('b')
+    data.get_chat(1).start()
+    data.get_chat(2).sleep()
+    crash(data)
+
+    data = Data(journal=True)
+    data.load('b')
+    assert data.get_chat(1).started
+    assert not data.get_chat(2).awake
+
+
+def test_replay_after_compaction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(journal=True)
+    data.load('b')
+    for chat_id in range(10):
+        data.get_chat(chat_id).start()
+    data.save('b')
+    data.close()
+
+    ## New records after a restart must number after the snapshot
+    data = Data(journal=True)
+    data.load('b')
+    data.get_chat(100).start()
+    data.get_chat(101).sleep()
+    crash(data)
+
+    data = Data(journal=True)
+    data.load('b')
+    assert data.get_chat(100).started
+    assert 101 in data.chats
+    assert not data.get_chat(101).awake
+    assert all(data.get_chat(chat_id).started for chat_id in range(10))
+
+
+def test_replay_after_torn_record(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(journal=True)
+    data.load('b')
+    data.get_chat(1).start()
+    data.get_chat(1).save('first message')
+    crash(data)
+    (segment,) = tmp_path.glob('b.bot-journal.*')
+    records = segment.read_bytes()
+
+    for cut in range(1, len(records)):
+        segment.write_bytes(records[:cut])
+        for path in tmp_path.glob('b.bot-journal.*'):
+            if path != segment:
+                path.unlink()
+
+        ## Records after a restart must not follow the torn bytes
+        data = Data(journal=True)
+        data.load('b')
+        data.get_chat(2).start()
+        crash(data)
+
+        data = Data(journal=True)
+        data.load('b')
+        assert data.get_chat(2).started
+        crash(data)
+
+
+@pytest.mark.parametrize('storage', [ShardStorage, SQLiteStorage])
+def test_replay_after_eviction(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(storage=storage(), journal=True, budget=1)
+    data.load('b')
+    data.get_chat(1).save('m1')
+    ## Writes chat 1 back, with its journaled change
+    data.get_chat(2).start()
+    crash(data)
+    data.storage.close()
+
+    data = Data(storage=storage(), journal=True)
+    data.load('b')
+    assert data.get_chat(1).cache == ['m1']
+    assert data.get_chat(2).started
+    data.close()
+
+
+def test_compaction_thread(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(journal=True, compact=10)
+    data.load('b')
+    dumped = threading.Event()
+    threads = []
+    dump = data.storage.dump
+    def record(memory):
+        threads.append(threading.current_thread())
+        dumped.set()
+        return dump(memory)
+    monkeypatch.setattr(data.storage, 'dump', record)
+
+    ## Handlers changing chats never write the snapshot themselves
+    for chat_id in range(10):
+        data.get_chat(chat_id).start()
+    assert dumped.wait(5)
+    assert threading.current_thread() not in threads
+    data.close()
+
+    data = Data(journal=True)
+    data.load('b')
+    assert data['lsn'] == 10
+    assert all(data.get_chat(chat_id).started for chat_id in range(10))
+    data.close()
@@ -0,0 +1,21 @@
+from telebot.proxy import Proxy
+
+
+def test_ttl_lru():
+    calls = []
+
+    @Proxy.proxy('member', ttl=60.0, key=(lambda info: info['chat_id']))
+    def member(bot, info):
+        calls.append(info['chat_id'])
+        return True
+
+    member.TTL_SIZE = 2
+    for chat_id in (1, 2, 1, 3, 1, 2):
+        member.func(None, {'chat_id': chat_id})
+    ## 1 is used again before 3 comes in, so 2 is dropped instead
+    assert calls == [1, 2, 3, 2]
+    assert member.stats.ttl_hits == 2
+
+    member.clear()
+    member.func(None, {'chat_id': 1})
+    assert calls[-1] == 1
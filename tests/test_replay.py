@@ -0,0 +1,33 @@
+from telebot.bot import TeleBot
+from telebot.bench import LoadGenerator, Recorder, Replay
+from telebot.proxy import Proxy
+
+
+@Proxy.proxy('member', ttl=60.0)
+def member(bot, info):
+    return True
+
+
+class StartBot(TeleBot):
+
+    @member
+    @TeleBot.command('start')
+    def start(self, update, context):
+        chat = self.get_chat(update.effective_chat.id)
+        if not chat.started:
+            chat.start()
+            update.message.reply_text('Welcome')
+        update.message.reply_text('Hello')
+
+
+def test_replay_repeatable(tmp_path):
+    generator = LoadGenerator(username='tbot')
+    with Recorder(str(tmp_path / 'updates.jsonl')) as recorder:
+        recorder.write({'update_id': 1, 'message': generator.command(1, 'start')}, 'tbot')
+
+    ## Runs in the same process start from the same state
+    before = Replay(StartBot, recorder.path).run()
+    after = Replay(StartBot, recorder.path).run()
+    assert before['calls'] == after['calls'] == 2
+    assert before['digest'] == after['digest']
+    assert StartBot.proxy_stats()[0]['ttl_hits'] == 0
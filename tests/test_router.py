@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from telegram import Update
+
+from telebot.bench import LoadGenerator
+from telebot.bot.router import CommandRouter, QueryRouter
+
+
+GENERATOR = LoadGenerator(username='tbot')
+
+
+def dispatch(router: object, data: dict) -> object:
+    update = Update.de_json(dict(data, update_id=1), None)
+    check = router.check_update(update)
+    if not check:
+        return check
+    context = SimpleNamespace()
+    return (router.handle_update(update, None, check, context), context)
+
+
+def test_command_router():
+    router = CommandRouter(SimpleNamespace(username='tbot'))
+    router.add('start', lambda update, context: 'start')
+    router.add('Help', lambda update, context: 'help')
+
+    result, context = dispatch(router, {'message': GENERATOR.command(1, 'start a b')})
+    assert result == 'start' and context.args == ['a', 'b']
+    assert dispatch(router, {'message': GENERATOR.command(1, 'HELP@TBot')})[0] == 'help'
+    ## Other bots' commands, unknown commands and plain text are left to other handlers
+    assert dispatch(router, {'message': GENERATOR.command(1, 'start@otherbot')}) is None
+    assert dispatch(router, {'message': GENERATOR.command(1, 'stop')}) is None
+    assert dispatch(router, {'message': GENERATOR.message(1, 'start')}) is None
+
+
+def test_command_router_filters():
+    router = CommandRouter(SimpleNamespace(username='tbot'))
+    router.add('start', lambda update, context: 'start', allow_edited=False)
+    assert dispatch(router, {'message': GENERATOR.command(1, 'start')})[0] == 'start'
+    assert dispatch(router, {'edited_message': GENERATOR.command(1, 'start')}) is False
+
+
+def test_query_router():
+    router = QueryRouter()
+    router.add('menu', lambda update, context: 'menu')
+    router.add('x', lambda update, context: 'x')
+
+    assert dispatch(router, {'callback_query': GENERATOR.query(1, 'menu:1')})[0] == 'menu'
+    assert dispatch(router, {'callback_query': GENERATOR.query(1, 'menu#abc')})[0] == 'menu'
+    ## Single letter keys are routed as well
+    assert dispatch(router, {'callback_query': GENERATOR.query(1, 'x:1')})[0] == 'x'
+    assert dispatch(router, {'callback_query': GENERATOR.query(1, 'other:1')}) is None
+    assert dispatch(router, {'callback_query': GENERATOR.query(1, 'menu')}) is None
+    assert dispatch(router, {'message': GENERATOR.message(1, 'menu:1')}) is None
@@ -0,0 +1,85 @@
+import pytest
+
+from telebot.data import Data, PickleStorage, ShardStorage, SQLiteStorage
+
+
+STORAGES = [PickleStorage, ShardStorage, SQLiteStorage]
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_round_trip(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(storage=storage(), budget=(None if storage is PickleStorage else 4))
+    try:
+        data.load('b')
+    except FileNotFoundError:
+        pass
+    for chat_id in range(10):
+        data.get_chat(chat_id).start()
+    data.get_chat(3).sleep()
+    data.common['a'] = 1
+    data.save('b')
+    data.close()
+
+    data = Data(storage=storage())
+    data.load('b')
+    assert data.common == {'a': 1}
+    assert sorted(chat.chat_id for chat in data.iter_chats()) == list(range(10))
+    assert all(data.get_chat(chat_id).started for chat_id in range(10))
+    assert not data.get_chat(3).awake
+    assert data.get_chat(4).awake
+    data.close()
+
+
+@pytest.mark.parametrize('storage', STORAGES)
+def test_round_trip_changes(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(storage=storage())
+    try:
+        data.load('b')
+    except FileNotFoundError:
+        pass
+    data.get_chat(1).start()
+    data.save('b')
+    ## Only the chat changed since is written again
+    data.get_chat(1).sleep()
+    data.get_chat(2).start()
+    data.save('b')
+    data.close()
+
+    data = Data(storage=storage())
+    data.load('b')
+    assert not data.get_chat(1).awake
+    assert data.get_chat(2).started
+    data.close()
+
+
+@pytest.mark.parametrize('storage', [PickleStorage, SQLiteStorage])
+def test_checkpoint_failure(storage, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = Data(storage=storage())
+    try:
+        data.load('b')
+    except FileNotFoundError:
+        pass
+    data.get_chat(1).start()
+    data.common['a'] = 1
+
+    dump = data.storage.dump
+    def fail(memory):
+        raise OSError('disk full')
+    monkeypatch.setattr(data.storage, 'dump', fail)
+    with pytest.raises(OSError):
+        data.save('b')
+    monkeypatch.setattr(data.storage, 'dump', dump)
+
+    ## Changes taken by the failed checkpoint are written by the next one
+    data.save('b')
+    assert data.last_written[0] == 1
+    data.close()
+
+    data = Data(storage=storage())
+    data.load('b')
+    assert data.get_chat(1).started
+    assert data.common == {'a': 1}
+    data.close()
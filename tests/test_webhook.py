@@ -0,0 +1,43 @@
+import json
+import threading
+import urllib.request
+
+from telegram.ext import Filters
+
+from telebot.bot import TeleBot
+from telebot.bench import Benchmark, FakeServer, LoadGenerator
+
+
+class EchoBot(TeleBot):
+
+    @TeleBot.message(Filters.text)
+    def echo(self, update, context):
+        update.message.reply_text(update.message.text)
+
+
+def test_webhook_post(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sent = []
+    answered = threading.Event()
+
+    def on_call(method, params, now):
+        if method == 'sendMessage':
+            sent.append(params)
+            answered.set()
+
+    with FakeServer(token='123:abc') as server:
+        server.listeners.append(on_call)
+        bot = EchoBot('123:abc', url=server.url)
+        port = Benchmark.free_port()
+        bot.run(idle=False, webhook=True, port=port, secret='secret')
+        try:
+            update = {'update_id': 1, 'message': LoadGenerator().message(7, 'Hello')}
+            request = urllib.request.Request(f'http://127.0.0.1:{port}/secret', json.dumps(update).encode('utf-8'), {'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                assert response.status == 200
+            assert answered.wait(5)
+        finally:
+            bot.stop()
+
+    assert len(sent) == 1
+    assert str(sent[0]['chat_id']) == '7' and sent[0]['text'] == 'Hello'
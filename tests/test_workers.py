@@ -0,0 +1,26 @@
+import threading
+
+from telegram import Update
+
+from telebot.bot import TeleBot
+from telebot.bench import LoadGenerator
+
+
+def test_restart_workers():
+    bot = TeleBot('123:abc')
+    threads = []
+    callback = bot.ordered(lambda self, update, context: threads.append(threading.current_thread()))
+    update = Update.de_json({'update_id': 1, 'message': LoadGenerator().message(1, 'Hello')}, None)
+
+    bot.start_workers(2)
+    callback(update, None)
+    bot.stop_workers()
+    assert bot.workers is None and threads[-1] is not threading.current_thread()
+
+    ## Handled inline once stopped, and on new workers once started again
+    callback(update, None)
+    assert threads[-1] is threading.current_thread()
+    bot.start_workers(2)
+    callback(update, None)
+    bot.stop_workers()
+    assert len(threads) == 3 and threads[-1] is not threading.current_thread()